@@ -138,21 +138,14 @@ class EnhancedTradingSystem:
         up_count = 0
         down_count = 0
         
-        for _, pred in predictions.iterrows():
-            if pred.get("grok_direction") == "up":
-                up_count += 1
-            elif pred.get("grok_direction") == "down":
-                down_count += 1
-            
-            if pred.get("gemini_direction") == "up":
-                up_count += 1
-            elif pred.get("gemini_direction") == "down":
-                down_count += 1
-            
-            if pred.get("deepseek_direction") == "up":
-                up_count += 1
-            elif pred.get("deepseek_direction") == "down":
-                down_count += 1
+        # itertuples 不为每行构造Series；缺失的列按无预测处理
+        for pred in predictions.itertuples(index=False):
+            for column in ("grok_direction", "gemini_direction", "deepseek_direction"):
+                direction = getattr(pred, column, None)
+                if direction == "up":
+                    up_count += 1
+                elif direction == "down":
+                    down_count += 1
         
         total = up_count + down_count
         
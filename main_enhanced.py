@@ -455,6 +455,51 @@ def api_get_summary():
         }), 500
 
 
+# 批量接口支持的只读操作
+BATCH_OPS = {
+    'decision': api_get_decision,
+    'summary': api_get_summary,
+}
+
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """
+    API接口: 批量执行只读操作（一次请求获取多个结果）
+    
+    POST参数:
+        操作列表，例如 [{"op": "decision"}, {"op": "summary"}]
+    
+    返回:
+        JSON数组，按请求顺序对应各操作的返回结果；每项带 http_status 字段，
+        即该操作单独调用时的HTTP状态码（不支持的操作为400）
+    """
+    ops = request.get_json(silent=True)
+    if not isinstance(ops, list):
+        return jsonify({
+            'status': 'error',
+            'message': '请求体必须是操作列表'
+        }), 400
+    
+    results = []
+    for item in ops:
+        op = item.get('op') if isinstance(item, dict) else None
+        handler = BATCH_OPS.get(op)
+        if handler is None:
+            results.append({
+                'status': 'error',
+                'message': f'不支持的操作: {op}',
+                'http_status': 400
+            })
+            continue
+        response = app.make_response(handler())
+        result = response.get_json()
+        result['http_status'] = response.status_code
+        results.append(result)
+    
+    return jsonify(results)
+
+
 @app.route('/api/health', methods=['GET'])
 def api_health():
     """
@@ -483,6 +528,7 @@ def start_api_server(host: str = '0.0.0.0', port: int = 5000):
     logger.info(f"  - POST http://{host}:{port}/api/analyze   执行分析")
     logger.info(f"  - GET  http://{host}:{port}/api/decision  获取决策")
     logger.info(f"  - GET  http://{host}:{port}/api/summary   获取摘要")
+    logger.info(f"  - POST http://{host}:{port}/api/batch     批量获取")
     logger.info(f"  - GET  http://{host}:{port}/api/health    健康检查")
     logger.info("\n" + "="*80)
     
@@ -8,6 +8,7 @@
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Tuple
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +49,21 @@ class BaseStrategy(ABC):
         """
         pass
     
+    def batch_analyze(self, features: np.ndarray, metas: List[Dict]) -> List[Dict]:
+        """
+        批量分析多组特征（如回测中的每根K线）
+        
+        Args:
+            features: (N, F) 特征矩阵，每行一个26维特征向量
+            metas: 长度为N的元数据列表
+        
+        Returns:
+            长度为N的信号列表，与逐行调用analyze的结果一致
+        """
+        # 整块转换为Python float，避免逐元素取numpy标量
+        rows = np.asarray(features, dtype=np.float64).tolist()
+        return [self.analyze(row, meta) for row, meta in zip(rows, metas)]
+    
     @abstractmethod
     def get_description(self) -> str:
         """返回策略描述"""
@@ -12,116 +12,211 @@ AI集成测试 - 演示AI如何调用决策引擎
 import sys
 import os
 import json
-import requests
+import functools
 import time
 
+# orjson解析更快（可选），未安装时回退到标准库json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from main_enhanced import EnhancedTradingSystem
+# 分隔线
+BANNER80 = "=" * 80
+
+
+@functools.lru_cache(maxsize=None)
+def get_session():
+    """复用同一个会话：对同一API服务器的多次请求共享keep-alive连接池
+    
+    首次调用时才导入requests，直接调用/模拟等不发请求的测试无需加载
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, backoff_factor=0.2)
+    ))
+    return session
+
+
+# 健康检查结果缓存时长（秒）
+HEALTH_CHECK_TTL = 30
+
+
+@functools.lru_cache(maxsize=1)
+def _healthy(base_url, epoch_bucket):
+    """健康检查，按时间桶缓存；失败时抛异常，不会被缓存"""
+    response = get_session().get(f"{base_url}/api/health", timeout=2)
+    response.raise_for_status()
+    return _json_loads(response.content)
+
+
+# 直接调用分析结果的缓存TTL（秒）
+CACHE_TTL = int(os.getenv("PREDICT_ANALYSIS_TTL", "15"))
+# 置信度低于此值的决策不缓存（信号不稳定，下一次分析可能反转）
+CACHE_MIN_CONFIDENCE = 60
+# symbol -> (过期时间, success, decision_json, summary_text)
+_ANALYSIS_CACHE = {}
+
+
+def _run_analysis_cached(symbol):
+    """带TTL缓存的单次分析，返回 (success, decision_json, summary_text)"""
+    entry = _ANALYSIS_CACHE.get(symbol)
+    if entry and entry[0] > time.monotonic():
+        return entry[1:]
+    
+    # 创建系统实例并执行分析（决策系统依赖较多，用到时才导入）
+    from main_enhanced import EnhancedTradingSystem
+    system = EnhancedTradingSystem(account_balance=10000, risk_percent=0.015)
+    success = system.run_single_analysis(symbol)
+    decision_json = system.get_latest_decision_json()
+    summary = system.get_latest_decision_summary()
+    
+    # 只缓存成功且置信度足够的结果
+    if success and system.latest_decision['decision']['confidence'] >= CACHE_MIN_CONFIDENCE:
+        _ANALYSIS_CACHE[symbol] = (time.monotonic() + CACHE_TTL, success, decision_json, summary)
+    
+    return success, decision_json, summary
 
 
 def test_direct_call():
     """测试1: 直接调用决策引擎"""
-    print("="*80)
+    print(BANNER80)
     print("测试1: 直接调用决策引擎")
-    print("="*80)
-    
-    # 创建系统实例
-    system = EnhancedTradingSystem(account_balance=10000, risk_percent=0.015)
+    print(BANNER80)
     
-    # 执行分析
-    success = system.run_single_analysis("BTCUSDT")
+    # 执行分析（TTL内重复调用直接返回缓存结果）
+    success, decision_json, summary = _run_analysis_cached("BTCUSDT")
     
     if success:
         print("\n✅ 分析成功！")
         
         # 获取JSON格式结果
-        print("\n" + "="*80)
+        print("\n" + BANNER80)
         print("JSON格式结果（供AI解析）:")
-        print("="*80)
-        print(system.get_latest_decision_json())
+        print(BANNER80)
+        print(decision_json)
         
         # 获取文本摘要
-        print("\n" + "="*80)
+        print("\n" + BANNER80)
         print("文本摘要（供AI阅读）:")
-        print("="*80)
-        print(system.get_latest_decision_summary())
+        print(BANNER80)
+        print(summary)
     else:
         print("\n❌ 分析失败")
 
 
 def test_api_call():
     """测试2: 通过API调用（需要先启动API服务器）"""
-    print("\n\n" + "="*80)
+    print("\n\n" + BANNER80)
     print("测试2: 通过API调用")
-    print("="*80)
+    print(BANNER80)
     
     base_url = "http://localhost:5000"
     
     # 1. 健康检查
     print("\n1️⃣ 健康检查:")
     try:
-        response = requests.get(f"{base_url}/api/health", timeout=5)
-        print(f"  状态: {response.json()}")
+        # 同一时间桶内只探测一次，同时为后续请求预热连接池
+        status = _healthy(base_url, int(time.monotonic() // HEALTH_CHECK_TTL))
+        print(f"  状态: {status}")
     except Exception as e:
         print(f"  ❌ API服务器未启动: {e}")
         print(f"  💡 请先运行: python main_enhanced.py --mode api")
         return
     
+    session = get_session()
+    
     # 2. 执行分析
     print("\n2️⃣ 执行分析:")
-    try:
-        response = requests.post(
-            f"{base_url}/api/analyze",
-            json={"symbol": "BTCUSDT"},
-            timeout=60
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            print(f"  ✅ 分析成功")
-            print(f"  决策: {result['data']['decision']['action']}")
-            print(f"  置信度: {result['data']['decision']['confidence']}%")
-        else:
-            print(f"  ❌ 分析失败: {response.text}")
-    except Exception as e:
-        print(f"  ❌ 请求失败: {e}")
+    _show_response(_request(session.post, f"{base_url}/api/analyze", json={"symbol": "BTCUSDT"}, timeout=60),
+                   _show_analysis, "分析失败")
+    
+    # 3/4. 决策和摘要合并为一次批量请求
+    decision, summary = _split_batch(
+        _request(session.post, f"{base_url}/api/batch", json=[{"op": "decision"}, {"op": "summary"}], timeout=5),
+        2
+    )
     
-    # 3. 获取决策
     print("\n3️⃣ 获取最新决策:")
-    try:
-        response = requests.get(f"{base_url}/api/decision", timeout=5)
-        
-        if response.status_code == 200:
-            result = response.json()
-            decision = result['data']['decision']
-            print(f"  动作: {decision['action']}")
-            print(f"  置信度: {decision['confidence']}%")
-            print(f"  原因: {decision['reason']}")
-        else:
-            print(f"  ❌ 获取失败: {response.text}")
-    except Exception as e:
-        print(f"  ❌ 请求失败: {e}")
+    _show_result(decision, _show_decision)
     
-    # 4. 获取摘要
     print("\n4️⃣ 获取决策摘要:")
+    _show_result(summary, _show_summary)
+
+
+def _request(method, url, **kwargs):
+    """发送请求，异常作为结果返回"""
     try:
-        response = requests.get(f"{base_url}/api/summary", timeout=5)
-        
+        return method(url, **kwargs)
+    except Exception as e:
+        return e
+
+
+def _split_batch(response, count):
+    """把 /api/batch 的响应拆成各操作的结果；整体失败时每个位置都是该异常"""
+    try:
+        if isinstance(response, Exception):
+            raise response
+        response.raise_for_status()
+        return _json_loads(response.content)
+    except Exception as e:
+        return [e] * count
+
+
+def _show_result(result, show):
+    """打印批量请求中单个操作的结果；result 可能是请求异常"""
+    if isinstance(result, Exception):
+        print(f"  ❌ 请求失败: {result}")
+    elif result.get('status') == 'success':
+        show(result)
+    else:
+        print(f"  ❌ 获取失败: {result.get('message')}")
+
+
+def _show_response(response, show, fail_label="获取失败"):
+    """打印API响应；response 可能是请求异常"""
+    try:
+        if isinstance(response, Exception):
+            raise response
         if response.status_code == 200:
-            result = response.json()
-            print(result['summary'])
+            show(_json_loads(response.content))
         else:
-            print(f"  ❌ 获取失败: {response.text}")
+            print(f"  ❌ {fail_label}: {response.text}")
     except Exception as e:
         print(f"  ❌ 请求失败: {e}")
 
 
+def _show_analysis(result):
+    print(f"  ✅ 分析成功")
+    print(f"  决策: {result['data']['decision']['action']}")
+    print(f"  置信度: {result['data']['decision']['confidence']}%")
+
+
+def _show_decision(result):
+    decision = result['data']['decision']
+    print(f"  动作: {decision['action']}")
+    print(f"  置信度: {decision['confidence']}%")
+    print(f"  原因: {decision['reason']}")
+
+
+def _show_summary(result):
+    print(result['summary'])
+
+
 def simulate_ai_assistant():
     """测试3: 模拟AI助手调用"""
-    print("\n\n" + "="*80)
+    print("\n\n" + BANNER80)
     print("测试3: 模拟AI助手集成")
-    print("="*80)
+    print(BANNER80)
     
     print("""
 AI助手可以这样集成决策引擎:
@@ -138,9 +233,11 @@ AI助手的处理流程:
 ```python
 import requests
 
+session = requests.Session()  # 复用连接
+
 def get_trading_advice(symbol="BTCUSDT"):
     # 执行分析
-    response = requests.post(
+    response = session.post(
         "http://localhost:5000/api/analyze",
         json={"symbol": symbol}
     )
@@ -199,68 +296,228 @@ if plan['capital_loss_percent'] > 50:
     print("  ✅ 多语言自然交互")
 
 
-def create_ai_integration_examples():
-    """创建AI集成示例代码"""
-    print("\n\n" + "="*80)
-    print("生成AI集成示例代码")
-    print("="*80)
-    
-    examples = {
-        "example_1_simple.py": """#!/usr/bin/env python3
+# AI集成示例代码：内容固定，导入时一次性编码为UTF-8字节
+AI_INTEGRATION_EXAMPLES = {
+    "example_1_simple.py": """#!/usr/bin/env python3
 '''简单示例: AI助手获取交易建议'''
 
+import logging
+import time
 import requests
 
-def ai_get_trading_advice(symbol="BTCUSDT"):
-    '''AI助手函数: 获取交易建议'''
+# orjson解析更快（可选），未安装时回退到标准库json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+logger = logging.getLogger(__name__)
+
+# 复用连接（HTTP keep-alive）
+SESSION = requests.Session()
+
+# 最近一次成功的分析结果: symbol -> (获取时间, data)
+_LAST_GOOD = {}
+
+def format_advice(symbol, data):
+    '''把分析结果转成自然语言回答'''
+    decision = data['decision']
+    
+    lines = []
+    append = lines.append  # 绑定方法，省去每次的属性查找
+    
+    append(f"📊 {symbol} 交易分析\\n\\n")
+    append(f"🎯 建议: {decision['action']}\\n")
+    append(f"📈 置信度: {decision['confidence']:.0f}%\\n")
+    append(f"💡 原因: {decision['reason']}\\n")
+    
+    # 如果有仓位信息
+    if data['position']:
+        pos = data['position']
+        append(f"\\n💰 仓位建议:\\n")
+        append(f"  - 仓位: {pos['position_size']:.6f} BTC\\n")
+        append(f"  - 止损: ${pos['stop_loss']:,.2f}\\n")
+        append(f"  - 止盈: ${pos['take_profit_1']:,.2f}\\n")
+    
+    return "".join(lines)
+
+def ai_get_trading_advice(symbol="BTCUSDT", allow_stale=True):
+    '''AI助手函数: 获取交易建议
+    
+    allow_stale=True 时，上游故障（网络异常或5xx）会降级返回最近一次成功的结果
+    '''
     try:
         # 调用决策引擎API
-        response = requests.post(
+        response = SESSION.post(
             "http://localhost:5000/api/analyze",
             json={"symbol": symbol},
             timeout=60
         )
         
         if response.status_code == 200:
-            data = response.json()['data']
-            decision = data['decision']
-            
-            # 生成自然语言回答
-            advice = f"📊 {symbol} 交易分析\\n\\n"
-            advice += f"🎯 建议: {decision['action']}\\n"
-            advice += f"📈 置信度: {decision['confidence']:.0f}%\\n"
-            advice += f"💡 原因: {decision['reason']}\\n"
-            
-            # 如果有仓位信息
-            if data['position']:
-                pos = data['position']
-                advice += f"\\n💰 仓位建议:\\n"
-                advice += f"  - 仓位: {pos['position_size']:.6f} BTC\\n"
-                advice += f"  - 止损: ${pos['stop_loss']:,.2f}\\n"
-                advice += f"  - 止盈: ${pos['take_profit_1']:,.2f}\\n"
-            
-            return advice
-        else:
+            data = json_loads(response.content)['data']
+            _LAST_GOOD[symbol] = (time.monotonic(), data)
+            return format_advice(symbol, data)
+        if response.status_code < 500:
             return "❌ 无法获取分析结果"
+        error = f"HTTP {response.status_code}"
             
+    except requests.RequestException as e:
+        error = str(e)
     except Exception as e:
         return f"❌ 错误: {str(e)}"
+    
+    entry = _LAST_GOOD.get(symbol)
+    if not allow_stale or entry is None:
+        return f"❌ 错误: {error}"
+    
+    age = time.monotonic() - entry[0]
+    logger.warning("分析 %s 失败(%s)，返回 %.1f 秒前的缓存结果", symbol, error, age)
+    return f"⚠️ 实时分析暂不可用，以下是{age:.0f}秒前的结果\\n\\n" + format_advice(symbol, entry[1])
 
 # 使用示例
 if __name__ == "__main__":
     print(ai_get_trading_advice("BTCUSDT"))
 """,
-        
-        "example_2_chatbot.py": """#!/usr/bin/env python3
+
+    "example_2_chatbot.py": """#!/usr/bin/env python3
 '''示例2: AI聊天机器人集成'''
 
+import os
+import re
+import time
+import hashlib
+import logging
 import requests
 
+# orjson解析更快（可选），未安装时回退到标准库json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Redis可选：多个机器人实例共享 /api/analyze 结果
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 交易对识别：一次正则扫描 + 字典查表（注意中文前后没有单词边界，不能用 \\b）
+SYMBOL_MAP = {
+    "btc": "BTCUSDT", "比特币": "BTCUSDT",
+    "eth": "ETHUSDT", "以太坊": "ETHUSDT",
+    "sol": "SOLUSDT",
+    "bnb": "BNBUSDT",
+}
+SYMBOL_RE = re.compile("|".join(map(re.escape, SYMBOL_MAP)), re.IGNORECASE)
+
+# 响应缓存TTL（秒），可通过环境变量覆盖
+CACHE_TTL_ANALYZE = float(os.getenv("CACHE_TTL_ANALYZE", "15"))
+CACHE_TTL_SUMMARY = float(os.getenv("CACHE_TTL_SUMMARY", "5"))
+# 置信度低于此值的分析结果不写入共享缓存
+SHARED_CACHE_MIN_CONFIDENCE = 60
+
 class TradingChatbot:
     '''交易AI聊天机器人'''
     
     def __init__(self, api_base="http://localhost:5000"):
         self.api_base = api_base
+        self.session = requests.Session()  # 复用连接
+        self._cache = {}  # (endpoint, symbol) -> (过期时间, 响应数据)，过期后不删除
+        
+        self.redis = None
+        if REDIS_AVAILABLE:
+            self.redis = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=6379, decode_responses=True)
+        self.cache_stats = {"hit": 0, "miss": 0}  # 共享缓存命中统计
+    
+    def _shared_key(self, endpoint, symbol, ttl):
+        '''共享缓存键：同一时间桶内的相同请求得到相同的键'''
+        raw = f"{endpoint}|{symbol}|{int(time.time() // ttl)}"
+        return f"predict:{endpoint}:" + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+    
+    def _shared_get(self, key):
+        '''读取Redis共享缓存，Redis不可用时视为未命中'''
+        try:
+            cached = self.redis.get(key)
+        except redis.RedisError as e:
+            logger.warning("Redis读取失败: %s", e)
+            return None
+        
+        self.cache_stats["hit" if cached else "miss"] += 1
+        return json_loads(cached) if cached else None
+    
+    def _shared_set(self, key, ttl, payload, raw):
+        '''写入Redis共享缓存（低置信度的决策不缓存）'''
+        if payload['data']['decision']['confidence'] < SHARED_CACHE_MIN_CONFIDENCE:
+            return
+        try:
+            self.redis.setex(key, max(1, int(ttl)), raw)
+        except redis.RedisError as e:
+            logger.warning("Redis写入失败: %s", e)
+    
+    def _cached_call(self, endpoint, symbol, ttl, fetch, allow_stale=True, shared=False):
+        '''TTL缓存：有效期内直接返回上次的响应，跳过HTTP往返
+        
+        shared=True 时本地未命中会再查Redis共享缓存；
+        上游故障（网络异常或5xx）时，allow_stale=True 会返回已过期的条目并标记 "stale": True
+        '''
+        key = (endpoint, symbol)
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        
+        shared_key = None
+        if shared and self.redis is not None:
+            shared_key = self._shared_key(endpoint, symbol, ttl)
+            payload = self._shared_get(shared_key)
+            if payload is not None:
+                self._cache[key] = (now + ttl, payload)
+                return payload
+        
+        try:
+            response = fetch()
+        except requests.RequestException:
+            response = None
+        
+        if response is not None and response.status_code == 200:
+            payload = json_loads(response.content)
+            self._cache[key] = (now + ttl, payload)
+            if shared_key:
+                self._shared_set(shared_key, ttl, payload, response.content)
+            return payload
+        
+        upstream_error = response is None or response.status_code >= 500
+        if allow_stale and upstream_error and entry:
+            logger.warning("%s %s 请求失败，返回已过期 %.1f 秒的缓存", endpoint, symbol, now - entry[0])
+            return {**entry[1], "stale": True}
+        return None
+    
+    def cached_analyze(self, symbol, ttl=CACHE_TTL_ANALYZE, allow_stale=True):
+        '''带缓存的 /api/analyze'''
+        return self._cached_call(
+            "analyze", symbol, ttl,
+            lambda: self.session.post(f"{self.api_base}/api/analyze", json={"symbol": symbol}),
+            allow_stale,
+            shared=True
+        )
+    
+    def cached_summary(self, ttl=CACHE_TTL_SUMMARY, allow_stale=True):
+        '''带缓存的 /api/summary'''
+        return self._cached_call(
+            "summary", None, ttl,
+            lambda: self.session.get(f"{self.api_base}/api/summary"),
+            allow_stale
+        )
+    
+    def batch(self, *ops):
+        '''一次请求执行多个只读操作，如 bot.batch("decision", "summary")，按顺序返回各结果'''
+        response = self.session.post(f"{self.api_base}/api/batch", json=[{"op": op} for op in ops])
+        response.raise_for_status()
+        return json_loads(response.content)
     
     def process_user_query(self, user_input: str) -> str:
         '''处理用户查询'''
@@ -277,36 +534,36 @@ class TradingChatbot:
         else:
             return "我可以帮你分析交易机会、评估风险。你想了解什么？"
     
-    def handle_buy_query(self, query: str) -> str:
+    def handle_buy_query(self, query: str, allow_stale: bool = True) -> str:
         '''处理买入询问'''
         symbol = self.extract_symbol(query)
         
-        # 调用API分析
-        response = requests.post(
-            f"{self.api_base}/api/analyze",
-            json={"symbol": symbol}
-        )
+        # 调用API分析（短时间内重复询问直接命中缓存）
+        result = self.cached_analyze(symbol, allow_stale=allow_stale)
         
-        if response.status_code == 200:
-            decision = response.json()['data']['decision']
+        if result:
+            decision = result['data']['decision']
+            note = "\\n（实时分析暂不可用，以上为最近一次结果）" if result.get('stale') else ""
             
             if decision['action'] == 'BUY':
-                return f"✅ 现在是买入{symbol}的好时机！\\n置信度: {decision['confidence']:.0f}%\\n原因: {decision['reason']}"
+                return f"✅ 现在是买入{symbol}的好时机！\\n置信度: {decision['confidence']:.0f}%\\n原因: {decision['reason']}{note}"
             elif decision['action'] == 'SELL':
-                return f"⚠️ 建议不要买入{symbol}。\\n原因: {decision['reason']}"
+                return f"⚠️ 建议不要买入{symbol}。\\n原因: {decision['reason']}{note}"
             else:
-                return f"🤔 建议观望{symbol}。\\n原因: {decision['reason']}"
+                return f"🤔 建议观望{symbol}。\\n原因: {decision['reason']}{note}"
         
         return "抱歉，无法获取分析结果。"
     
-    def handle_analysis_query(self, query: str) -> str:
+    def handle_analysis_query(self, query: str, allow_stale: bool = True) -> str:
         '''处理分析请求'''
         symbol = self.extract_symbol(query)
         
-        response = requests.get(f"{self.api_base}/api/summary")
+        result = self.cached_summary(allow_stale=allow_stale)
         
-        if response.status_code == 200:
-            return response.json()['summary']
+        if result:
+            if result.get('stale'):
+                return "（实时分析暂不可用，以下为最近一次结果）\\n" + result['summary']
+            return result['summary']
         
         return "抱歉，无法获取分析报告。"
     
@@ -316,12 +573,8 @@ class TradingChatbot:
     
     def extract_symbol(self, query: str) -> str:
         '''从查询中提取交易对'''
-        if "BTC" in query.upper() or "比特币" in query:
-            return "BTCUSDT"
-        elif "ETH" in query.upper() or "以太坊" in query:
-            return "ETHUSDT"
-        else:
-            return "BTCUSDT"  # 默认
+        m = SYMBOL_RE.search(query)
+        return SYMBOL_MAP[m.group(0).lower()] if m else "BTCUSDT"  # 默认BTC
 
 # 使用示例
 if __name__ == "__main__":
@@ -338,18 +591,31 @@ if __name__ == "__main__":
         print(f"\\n用户: {query}")
         print(f"AI: {bot.process_user_query(query)}")
 """,
-        
-        "example_3_telegram_bot.py": """#!/usr/bin/env python3
+
+    "example_3_telegram_bot.py": """#!/usr/bin/env python3
 '''示例3: Telegram机器人集成'''
 
-# 需要安装: pip install python-telegram-bot
+# 需要安装: pip install python-telegram-bot "httpx[http2]"
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-import requests
+import httpx
+
+# orjson解析更快（可选），未安装时回退到标准库json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 TELEGRAM_TOKEN = "your_telegram_bot_token"
 API_BASE = "http://localhost:5000"
 
+# 异步HTTP客户端：不阻塞事件循环，所有用户共享keep-alive连接池
+CLIENT = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    timeout=60.0,
+    http2=True
+)
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     '''处理 /start 命令'''
     await update.message.reply_text(
@@ -369,14 +635,13 @@ async def analyze(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         # 调用API
-        response = requests.post(
+        response = await CLIENT.post(
             f"{API_BASE}/api/analyze",
-            json={"symbol": symbol},
-            timeout=60
+            json={"symbol": symbol}
         )
         
         if response.status_code == 200:
-            decision = response.json()['data']['decision']
+            decision = json_loads(response.content)['data']['decision']
             
             message = f"📊 {symbol} 分析结果\\n\\n"
             message += f"🎯 建议: {decision['action']}\\n"
@@ -393,10 +658,10 @@ async def analyze(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
     '''处理 /summary 命令'''
     try:
-        response = requests.get(f"{API_BASE}/api/summary")
+        response = await CLIENT.get(f"{API_BASE}/api/summary")
         
         if response.status_code == 200:
-            summary = response.json()['summary']
+            summary = json_loads(response.content)['summary']
             await update.message.reply_text(summary)
         else:
             await update.message.reply_text("❌ 无法获取摘要")
@@ -404,9 +669,13 @@ async def summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         await update.message.reply_text(f"❌ 错误: {str(e)}")
 
+async def close_client(application: Application):
+    '''机器人停止时关闭HTTP客户端'''
+    await CLIENT.aclose()
+
 def main():
     '''启动Telegram机器人'''
-    app = Application.builder().token(TELEGRAM_TOKEN).build()
+    app = Application.builder().token(TELEGRAM_TOKEN).post_shutdown(close_client).build()
     
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("analyze", analyze))
@@ -418,16 +687,36 @@ def main():
 if __name__ == "__main__":
     main()
 """
-    }
+}
+
+_EXAMPLE_BYTES = {name: code.encode("utf-8") for name, code in AI_INTEGRATION_EXAMPLES.items()}
+
+
+def create_ai_integration_examples():
+    """创建AI集成示例代码"""
+    print("\n\n" + BANNER80)
+    print("生成AI集成示例代码")
+    print(BANNER80)
     
     # 保存示例代码
     examples_dir = "ai_integration_examples"
     os.makedirs(examples_dir, exist_ok=True)
     
-    for filename, code in examples.items():
+    for filename, data in _EXAMPLE_BYTES.items():
         filepath = os.path.join(examples_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(code)
+        
+        # 内容未变化时跳过写入
+        if os.path.exists(filepath) and os.path.getsize(filepath) == len(data):
+            with open(filepath, 'rb') as f:
+                if f.read() == data:
+                    print(f"  ✅ 已是最新: {filepath}")
+                    continue
+        
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
         print(f"  ✅ 已生成: {filepath}")
     
     print(f"\n💡 AI集成示例已保存到 {examples_dir}/ 目录")
@@ -435,9 +724,9 @@ if __name__ == "__main__":
 
 def main():
     """主函数"""
-    print("="*80)
+    print(BANNER80)
     print("🤖 AI集成测试套件")
-    print("="*80)
+    print(BANNER80)
     
     import argparse
     parser = argparse.ArgumentParser(description='AI集成测试')
@@ -457,9 +746,9 @@ def main():
     if args.test in ['examples', 'all']:
         create_ai_integration_examples()
     
-    print("\n" + "="*80)
+    print("\n" + BANNER80)
     print("✅ 测试完成！")
-    print("="*80)
+    print(BANNER80)
 
 
 if __name__ == "__main__":
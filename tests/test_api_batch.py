@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/api/batch 批量接口测试
+用Flask测试客户端验证各操作的结果和 http_status
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+import unittest
+from unittest import mock
+
+import utils.data_integrator
+
+
+class FakeTradingSystem:
+    """只提供批量接口用到的属性和方法"""
+
+    def __init__(self, latest_decision=None, summary_error=None):
+        self.latest_decision = latest_decision
+        self.summary_error = summary_error
+
+    def get_latest_decision_summary(self):
+        if self.summary_error:
+            raise self.summary_error
+        return "决策摘要"
+
+
+class TestApiBatch(unittest.TestCase):
+    """测试批量接口"""
+
+    @classmethod
+    def setUpClass(cls):
+        """导入 main_enhanced（不写日志文件，交易系统由测试替换）"""
+        # main_enhanced 导入的 IntegratedDataFetcher 在本接口中用不到
+        with mock.patch.object(utils.data_integrator, 'IntegratedDataFetcher', create=True), \
+             mock.patch('logging.FileHandler', lambda *args, **kwargs: logging.NullHandler()):
+            import main_enhanced
+        cls.module = main_enhanced
+        cls.client = main_enhanced.app.test_client()
+
+    def post_batch(self, trading_system, ops):
+        with mock.patch.object(self.module, 'trading_system', trading_system):
+            return self.client.post('/api/batch', json=ops)
+
+    def test_mixed_ops(self):
+        """有效和不支持的操作混合时，各项保留自己的状态码"""
+        response = self.post_batch(
+            FakeTradingSystem(latest_decision=None),
+            [{'op': 'decision'}, {'op': 'summary'}, {'op': 'unknown'}, 'not-a-dict']
+        )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()
+        self.assertEqual([r['http_status'] for r in results], [404, 200, 400, 400])
+        self.assertEqual(results[0]['status'], 'error')
+        self.assertEqual(results[1]['summary'], "决策摘要")
+        self.assertIn('unknown', results[2]['message'])
+
+    def test_success_and_server_error(self):
+        """有决策时返回200，操作内部异常时返回500"""
+        response = self.post_batch(
+            FakeTradingSystem(latest_decision={'action': 'HOLD'}, summary_error=RuntimeError('boom')),
+            [{'op': 'decision'}, {'op': 'summary'}]
+        )
+
+        results = response.get_json()
+        self.assertEqual(results[0]['http_status'], 200)
+        self.assertEqual(results[0]['data'], {'action': 'HOLD'})
+        self.assertEqual(results[1]['http_status'], 500)
+        self.assertEqual(results[1]['message'], 'boom')
+
+    def test_rejects_non_list_body(self):
+        """请求体不是列表时整体返回400"""
+        response = self.post_batch(FakeTradingSystem(), {'op': 'decision'})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
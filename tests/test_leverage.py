@@ -6,10 +6,34 @@
 
 import sys
 import os
+import io
+import numpy as np
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils.decision_engine import DecisionEngine
 
+# 分隔线
+BANNER80 = "=" * 80
+RULE120 = "-" * 120
+
+# 分批止盈: (风险距离倍数, 平仓比例)
+TAKE_PROFIT_LEVELS = ((1.5, 0.50), (2.5, 0.30), (4.0, 0.20))
+
+# 场景结果的列式存储
+SCENARIO_DTYPE = np.dtype([
+    ('capital', 'f8'),
+    ('leverage', 'i4'),
+    ('stop_loss_percent', 'f8'),
+    ('position_value', 'f8'),
+    ('max_loss', 'f8'),
+    ('capital_loss_percent', 'f8'),
+    ('total_profit_percent', 'f8'),
+    ('risk_reward_ratio', 'f8'),
+])
+
+# 场景对比表的列: 持仓价值, 止损亏损, 本金损失%, 预期收益%, 风险收益比
+COMPARISON_FIELDS = ['position_value', 'max_loss', 'capital_loss_percent', 'total_profit_percent', 'risk_reward_ratio']
+
 
 class LeverageCalculator:
     """杠杆交易计算器"""
@@ -26,181 +50,229 @@ class LeverageCalculator:
         self.leverage = leverage
         self.position_value = capital * leverage  # 持仓价值
     
-    def calculate_position(
-        self,
-        entry_price: float,
-        risk_percent: float = 0.01,
-        stop_loss_percent: float = 0.02
-    ):
+    @staticmethod
+    def calculate_position_batch(
+        entry_prices,
+        capitals,
+        leverages,
+        stop_loss_percents
+    ) -> dict:
         """
-        计算杠杆交易的仓位、止损和止盈
+        批量计算杠杆交易计划（向量化，适合参数网格扫描）
         
         Args:
-            entry_price: 入场价格
-            risk_percent: 本金风险比例（默认1%）
-            stop_loss_percent: 止损百分比（默认2%）
+            entry_prices: 入场价格数组
+            capitals: 本金数组（USDT）
+            leverages: 杠杆倍数数组
+            stop_loss_percents: 止损百分比数组
         
         Returns:
-            交易计划字典
+            字段名 -> ndarray 的字典，各数组与输入形状一致
         """
+        entry_price = np.asarray(entry_prices, dtype=np.float64)
+        capital = np.asarray(capitals, dtype=np.float64)
+        leverage = np.asarray(leverages, dtype=np.float64)
+        stop_loss_percent = np.asarray(stop_loss_percents, dtype=np.float64)
+        
         # 1. 计算可以开多少仓位（BTC数量）
-        position_size = self.position_value / entry_price
+        position_value = capital * leverage
+        position_size = position_value / entry_price
         
         # 2. 计算止损价（做多）
         stop_loss_price = entry_price * (1 - stop_loss_percent)
         
-        # 3. 计算每个点的盈亏（杠杆放大）
-        # 价格变动1%，本金变动 = 1% * 杠杆倍数
-        price_change_1pct = entry_price * 0.01
-        profit_per_1pct = position_size * price_change_1pct  # 1%涨跌的盈亏
-        
-        # 4. 计算止损时的亏损
-        price_drop = entry_price - stop_loss_price
-        total_loss = position_size * price_drop
-        capital_loss_percent = (total_loss / self.capital) * 100
+        # 3. 计算止损时的亏损
+        risk_distance = entry_price - stop_loss_price
+        total_loss = position_size * risk_distance
+        capital_loss_percent = (total_loss / capital) * 100
         
-        # 5. 验证是否会爆仓
+        # 4. 验证是否会爆仓
         # 爆仓价 = 入场价 * (1 - 1/杠杆倍数)
-        liquidation_price = entry_price * (1 - 0.98 / self.leverage)  # 98%考虑维持保证金
+        liquidation_price = entry_price * (1 - 0.98 / leverage)  # 98%考虑维持保证金
         liquidation_percent = ((entry_price - liquidation_price) / entry_price) * 100
+        margin_to_liquidation = np.divide(
+            capital_loss_percent, liquidation_percent,
+            out=np.zeros_like(capital_loss_percent), where=liquidation_percent > 0
+        )
         
-        # 6. 计算分批止盈价格
-        # 保守策略：风险收益比至少2:1
-        risk_distance = entry_price - stop_loss_price
+        result = {
+            'position_value': position_value,
+            'position_size': position_size,
+            'stop_loss_price': stop_loss_price,
+            'max_loss': total_loss,
+            'capital_loss_percent': capital_loss_percent,
+            'liquidation_price': liquidation_price,
+            'liquidation_percent': liquidation_percent,
+            'margin_to_liquidation': margin_to_liquidation,
+        }
+        
+        # 5. 分批止盈：保守策略，风险收益比至少2:1
+        total_expected_profit = np.zeros_like(entry_price)
+        for i, (multiple, close_ratio) in enumerate(TAKE_PROFIT_LEVELS, 1):
+            take_profit = entry_price + (risk_distance * multiple)
+            profit = position_size * (take_profit - entry_price) * close_ratio
+            total_expected_profit = total_expected_profit + profit
+            
+            result[f'tp{i}_price'] = take_profit
+            result[f'tp{i}_percent_change'] = ((take_profit - entry_price) / entry_price) * 100
+            result[f'tp{i}_profit'] = profit
+            result[f'tp{i}_profit_percent'] = (profit / capital) * 100
+        
+        # 6. 总计
+        result['total_expected_profit'] = total_expected_profit
+        result['total_profit_percent'] = (total_expected_profit / capital) * 100
+        result['risk_reward_ratio'] = np.divide(
+            total_expected_profit, np.abs(total_loss),
+            out=np.zeros_like(total_expected_profit), where=total_loss != 0
+        )
         
-        take_profit_1 = entry_price + (risk_distance * 1.5)  # 1.5倍风险
-        take_profit_2 = entry_price + (risk_distance * 2.5)  # 2.5倍风险
-        take_profit_3 = entry_price + (risk_distance * 4.0)  # 4倍风险
+        return result
+    
+    def calculate_position(
+        self,
+        entry_price: float,
+        risk_percent: float = 0.01,
+        stop_loss_percent: float = 0.02
+    ):
+        """
+        计算杠杆交易的仓位、止损和止盈
         
-        # 7. 计算各目标的盈利
-        profit_at_tp1 = position_size * (take_profit_1 - entry_price) * 0.50  # 卖50%
-        profit_at_tp2 = position_size * (take_profit_2 - entry_price) * 0.30  # 卖30%
-        profit_at_tp3 = position_size * (take_profit_3 - entry_price) * 0.20  # 卖20%
-        total_expected_profit = profit_at_tp1 + profit_at_tp2 + profit_at_tp3
+        Args:
+            entry_price: 入场价格
+            risk_percent: 本金风险比例（默认1%）
+            stop_loss_percent: 止损百分比（默认2%）
         
-        # 8. 计算盈利占本金的百分比
-        profit_percent_tp1 = (profit_at_tp1 / self.capital) * 100
-        profit_percent_tp2 = (profit_at_tp2 / self.capital) * 100
-        profit_percent_tp3 = (profit_at_tp3 / self.capital) * 100
-        total_profit_percent = (total_expected_profit / self.capital) * 100
+        Returns:
+            交易计划字典
+        """
+        # 单笔计划与批量计算共用同一套公式：按长度为1的数组计算后取第0个元素
+        batch = self.calculate_position_batch(
+            [entry_price], [self.capital], [self.leverage], [stop_loss_percent]
+        )
+        values = {field: float(column[0]) for field, column in batch.items()}
         
-        return {
+        plan = {
             'capital': self.capital,
             'leverage': self.leverage,
             'position_value': self.position_value,
-            'position_size': position_size,
+            'position_size': values['position_size'],
             'entry_price': entry_price,
             
             # 止损信息
-            'stop_loss_price': stop_loss_price,
+            'stop_loss_price': values['stop_loss_price'],
             'stop_loss_percent': stop_loss_percent * 100,
-            'max_loss': total_loss,
-            'capital_loss_percent': capital_loss_percent,
+            'max_loss': values['max_loss'],
+            'capital_loss_percent': values['capital_loss_percent'],
             
             # 爆仓信息
-            'liquidation_price': liquidation_price,
-            'liquidation_percent': liquidation_percent,
-            'margin_to_liquidation': capital_loss_percent / liquidation_percent if liquidation_percent > 0 else 0,
-            
-            # 止盈信息
-            'take_profit_1': {
-                'price': take_profit_1,
-                'percent_change': ((take_profit_1 - entry_price) / entry_price) * 100,
-                'profit': profit_at_tp1,
-                'profit_percent': profit_percent_tp1,
-                'position_close': 50
-            },
-            'take_profit_2': {
-                'price': take_profit_2,
-                'percent_change': ((take_profit_2 - entry_price) / entry_price) * 100,
-                'profit': profit_at_tp2,
-                'profit_percent': profit_percent_tp2,
-                'position_close': 30
-            },
-            'take_profit_3': {
-                'price': take_profit_3,
-                'percent_change': ((take_profit_3 - entry_price) / entry_price) * 100,
-                'profit': profit_at_tp3,
-                'profit_percent': profit_percent_tp3,
-                'position_close': 20
-            },
-            
-            # 总计
-            'total_expected_profit': total_expected_profit,
-            'total_profit_percent': total_profit_percent,
-            'risk_reward_ratio': total_expected_profit / abs(total_loss) if total_loss != 0 else 0
+            'liquidation_price': values['liquidation_price'],
+            'liquidation_percent': values['liquidation_percent'],
+            'margin_to_liquidation': values['margin_to_liquidation'],
         }
-    
-    def format_report(self, plan: dict) -> str:
-        """格式化交易计划报告"""
-        lines = []
-        lines.append("=" * 80)
-        lines.append("💰 杠杆交易计划")
-        lines.append("=" * 80)
         
-        # 基本信息
-        lines.append(f"\n📊 账户信息:")
-        lines.append(f"   本金: ${plan['capital']:.2f} USDT")
-        lines.append(f"   杠杆: {plan['leverage']}x")
-        lines.append(f"   持仓价值: ${plan['position_value']:,.2f} USDT")
-        lines.append(f"   入场价: ${plan['entry_price']:,.2f}")
-        lines.append(f"   仓位大小: {plan['position_size']:.8f} BTC")
+        # 止盈信息
+        for i, (_, close_ratio) in enumerate(TAKE_PROFIT_LEVELS, 1):
+            plan[f'take_profit_{i}'] = {
+                'price': values[f'tp{i}_price'],
+                'percent_change': values[f'tp{i}_percent_change'],
+                'profit': values[f'tp{i}_profit'],
+                'profit_percent': values[f'tp{i}_profit_percent'],
+                'position_close': round(close_ratio * 100)
+            }
         
-        # 风险管理
-        lines.append(f"\n🛡️ 风险管理:")
-        lines.append(f"   止损价: ${plan['stop_loss_price']:,.2f} (-{plan['stop_loss_percent']:.2f}%)")
-        lines.append(f"   止损亏损: ${plan['max_loss']:.2f} USDT")
-        lines.append(f"   本金损失: {plan['capital_loss_percent']:.2f}%")
-        lines.append(f"   ")
-        lines.append(f"   ⚠️  爆仓价: ${plan['liquidation_price']:,.2f} (-{plan['liquidation_percent']:.2f}%)")
+        # 总计
+        plan['total_expected_profit'] = values['total_expected_profit']
+        plan['total_profit_percent'] = values['total_profit_percent']
+        plan['risk_reward_ratio'] = values['risk_reward_ratio']
         
+        return plan
+    
+    # 报告模板：布局是数据，format_report 只负责准备字段
+    _REPORT_TEMPLATE = """\
+================================================================================
+💰 杠杆交易计划
+================================================================================
+
+📊 账户信息:
+   本金: ${capital:.2f} USDT
+   杠杆: {leverage}x
+   持仓价值: ${position_value:,.2f} USDT
+   入场价: ${entry_price:,.2f}
+   仓位大小: {position_size:.8f} BTC
+
+🛡️ 风险管理:
+   止损价: ${stop_loss_price:,.2f} (-{stop_loss_percent:.2f}%)
+   止损亏损: ${max_loss:.2f} USDT
+   本金损失: {capital_loss_percent:.2f}%
+   
+   ⚠️  爆仓价: ${liquidation_price:,.2f} (-{liquidation_percent:.2f}%){risk_warnings}
+
+🎯 止盈目标:{take_profits}
+
+📈 预期收益:
+   总盈利: ${total_expected_profit:.2f} USDT
+   本金收益: +{total_profit_percent:.2f}%
+   风险收益比: {risk_reward_ratio:.2f}:1
+
+💡 交易建议:
+   {leverage_advice}
+   {risk_reward_advice}
+
+================================================================================"""
+    
+    _TAKE_PROFIT_TEMPLATE = """
+   目标{index} ({position_close}%仓位):
+      价格: ${price:,.2f} (+{percent_change:.2f}%)
+      盈利: ${profit:.2f} USDT
+      本金收益: +{profit_percent:.2f}%"""
+    
+    def format_report(self, plan: dict) -> str:
+        """格式化交易计划报告"""
         # 风险警告
+        risk_warnings = ""
         if plan['capital_loss_percent'] > 50:
-            lines.append(f"   🚨 警告: 止损会导致本金损失超过50%！")
-        
+            risk_warnings += "\n   🚨 警告: 止损会导致本金损失超过50%！"
         if plan['liquidation_percent'] < plan['stop_loss_percent'] * 1.5:
-            lines.append(f"   🚨 危险: 止损价接近爆仓价，建议降低杠杆！")
+            risk_warnings += "\n   🚨 危险: 止损价接近爆仓价，建议降低杠杆！"
         
         # 止盈计划
-        lines.append(f"\n🎯 止盈目标:")
-        
-        for i, tp_key in enumerate(['take_profit_1', 'take_profit_2', 'take_profit_3'], 1):
-            tp = plan[tp_key]
-            lines.append(f"   目标{i} ({tp['position_close']}%仓位):")
-            lines.append(f"      价格: ${tp['price']:,.2f} (+{tp['percent_change']:.2f}%)")
-            lines.append(f"      盈利: ${tp['profit']:.2f} USDT")
-            lines.append(f"      本金收益: +{tp['profit_percent']:.2f}%")
-        
-        # 总计
-        lines.append(f"\n📈 预期收益:")
-        lines.append(f"   总盈利: ${plan['total_expected_profit']:.2f} USDT")
-        lines.append(f"   本金收益: +{plan['total_profit_percent']:.2f}%")
-        lines.append(f"   风险收益比: {plan['risk_reward_ratio']:.2f}:1")
+        take_profits = "".join(
+            self._TAKE_PROFIT_TEMPLATE.format_map({**plan[f'take_profit_{i}'], 'index': i})
+            for i in (1, 2, 3)
+        )
         
         # 建议
-        lines.append(f"\n💡 交易建议:")
-        if plan['leverage'] >= 50:
-            lines.append(f"   ⚠️  {plan['leverage']}x杠杆风险极高，建议降低到20x以下")
-        elif plan['leverage'] >= 20:
-            lines.append(f"   ⚠️  {plan['leverage']}x杠杆风险较高，适合经验丰富的交易者")
+        leverage = plan['leverage']
+        if leverage >= 50:
+            leverage_advice = f"⚠️  {leverage}x杠杆风险极高，建议降低到20x以下"
+        elif leverage >= 20:
+            leverage_advice = f"⚠️  {leverage}x杠杆风险较高，适合经验丰富的交易者"
         else:
-            lines.append(f"   ✅ {plan['leverage']}x杠杆相对稳健")
+            leverage_advice = f"✅ {leverage}x杠杆相对稳健"
         
-        if plan['risk_reward_ratio'] >= 2.0:
-            lines.append(f"   ✅ 风险收益比良好 ({plan['risk_reward_ratio']:.2f}:1)")
+        rr = plan['risk_reward_ratio']
+        if rr >= 2.0:
+            risk_reward_advice = f"✅ 风险收益比良好 ({rr:.2f}:1)"
         else:
-            lines.append(f"   ⚠️  风险收益比偏低 ({plan['risk_reward_ratio']:.2f}:1)")
-        
-        lines.append("\n" + "=" * 80)
+            risk_reward_advice = f"⚠️  风险收益比偏低 ({rr:.2f}:1)"
         
-        return "\n".join(lines)
+        return self._REPORT_TEMPLATE.format_map({
+            **plan,
+            'risk_warnings': risk_warnings,
+            'take_profits': take_profits,
+            'leverage_advice': leverage_advice,
+            'risk_reward_advice': risk_reward_advice,
+        })
 
 
 def test_leverage_scenarios():
     """测试不同杠杆场景"""
-    print("=" * 80)
-    print("🧪 杠杆交易测试 - 多场景对比")
-    print("=" * 80)
+    # 所有输出先写入缓冲区，最后一次性写到stdout
+    out = io.StringIO()
+    
+    print(BANNER80, file=out)
+    print("🧪 杠杆交易测试 - 多场景对比", file=out)
+    print(BANNER80, file=out)
     
     # BTC入场价
     entry_price = 50000
@@ -245,12 +317,23 @@ def test_leverage_scenarios():
         }
     ]
     
-    results = []
+    # 场景结果按列存放（结构化数组），由批量计算直接填充
+    results = np.empty(len(scenarios), dtype=SCENARIO_DTYPE)
+    results['capital'] = [scenario['capital'] for scenario in scenarios]
+    results['leverage'] = [scenario['leverage'] for scenario in scenarios]
+    results['stop_loss_percent'] = [scenario['stop_loss_percent'] for scenario in scenarios]
+    
+    batch = LeverageCalculator.calculate_position_batch(
+        np.full(len(scenarios), entry_price, dtype=np.float64),
+        results['capital'], results['leverage'], results['stop_loss_percent']
+    )
+    for field in COMPARISON_FIELDS:
+        results[field] = batch[field]
     
     for scenario in scenarios:
-        print(f"\n{'='*80}")
-        print(f"📋 {scenario['name']}")
-        print(f"{'='*80}")
+        print(f"\n{BANNER80}", file=out)
+        print(f"📋 {scenario['name']}", file=out)
+        print(BANNER80, file=out)
         
         calc = LeverageCalculator(scenario['capital'], scenario['leverage'])
         plan = calc.calculate_position(
@@ -258,31 +341,29 @@ def test_leverage_scenarios():
             stop_loss_percent=scenario['stop_loss_percent']
         )
         
-        print(calc.format_report(plan))
-        results.append({'name': scenario['name'], 'plan': plan})
+        print(calc.format_report(plan), file=out)
     
     # 对比总结
-    print("\n" + "="*80)
-    print("📊 场景对比总结")
-    print("="*80)
+    print("\n" + BANNER80, file=out)
+    print("📊 场景对比总结", file=out)
+    print(BANNER80, file=out)
     
-    print(f"\n{'场景':<40} {'持仓价值':<15} {'止损亏损':<15} {'本金损失%':<12} {'预期收益%':<12} {'风险收益比':<10}")
-    print("-" * 120)
+    print(f"\n{'场景':<40} {'持仓价值':<15} {'止损亏损':<15} {'本金损失%':<12} {'预期收益%':<12} {'风险收益比':<10}", file=out)
+    print(RULE120, file=out)
     
-    for result in results:
-        name = result['name'].split(':')[1].strip()[:35]
-        plan = result['plan']
+    for scenario, row in zip(scenarios, results):
+        name = scenario['name'].split(':')[1].strip()[:35]
         print(f"{name:<40} "
-              f"${plan['position_value']:>10,.0f}    "
-              f"${plan['max_loss']:>10,.2f}    "
-              f"{plan['capital_loss_percent']:>8.2f}%     "
-              f"{plan['total_profit_percent']:>8.2f}%     "
-              f"{plan['risk_reward_ratio']:>6.2f}:1")
+              f"${row['position_value']:>10,.0f}    "
+              f"${row['max_loss']:>10,.2f}    "
+              f"{row['capital_loss_percent']:>8.2f}%     "
+              f"{row['total_profit_percent']:>8.2f}%     "
+              f"{row['risk_reward_ratio']:>6.2f}:1", file=out)
     
     # 关键建议
-    print("\n" + "="*80)
-    print("💡 关键建议")
-    print("="*80)
+    print("\n" + BANNER80, file=out)
+    print("💡 关键建议", file=out)
+    print(BANNER80, file=out)
     
     print("""
 1. 杠杆越高，止损必须越严格：
@@ -313,22 +394,25 @@ def test_leverage_scenarios():
    - 高杠杆要配合小仓位，不要满仓
    - 设置好止损后，严格执行，不要侥幸
    - 波动率高的时候，降低杠杆或减少仓位
-""")
+""", file=out)
+    
+    print(BANNER80, file=out)
     
-    print("="*80)
+    sys.stdout.write(out.getvalue())
+    sys.stdout.flush()
 
 
 def main():
     """主函数"""
     test_leverage_scenarios()
     
-    print("\n" + "="*80)
+    print("\n" + BANNER80)
     print("✅ 测试完成！")
-    print("="*80)
+    print(BANNER80)
     print("\n建议阅读:")
     print("  - DECISION_ENGINE_GUIDE.md: 决策引擎使用指南")
     print("  - 风险警告: 杠杆交易风险极高，请务必谨慎！")
-    print("\n" + "="*80)
+    print("\n" + BANNER80)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,34 @@
 import os
 import time
-import schedule
 from openai import OpenAI
 import ccxt
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import logging
+from logging.handlers import RotatingFileHandler
+import re
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+# orjson解析更快（可选），未安装时回退到标准库json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# 提取回复中最外层的JSON对象（忽略前后的说明文字或```json代码块标记）
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # 初始化DeepSeek客户端
 deepseek_client = OpenAI(
     api_key="sk-asj9zBIXzGJpbWz5lPs9cWpcXDexAGootwULVSKjjcifVZ7d",
@@ -22,33 +41,110 @@ exchange = ccxt.okx({
     'apiKey': 'xxxxx',
     'secret': 'xxxx',
     'password': 'xxxx',  # OKX需要交易密码
+    'enableRateLimit': True,
+    'timeout': 10000,
 })
 
+# 复用同一个HTTP会话，每轮的多次REST请求共享keep-alive连接
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, pool_block=False))
+exchange.session = _session
+
 # 交易参数配置
 TRADE_CONFIG = {
-    'symbol': 'BTC/USDT:USDT',  # OKX的合约符号格式
-    'amount': 0.0001,  # 交易数量 (BTC)
+    # OKX的合约符号格式，默认只交易BTC；如需同时交易其他合约（如 'ETH/USDT:USDT'）在此追加，
+    # 并在amount中配置数量。所有合约同一轮共用一次DeepSeek请求
+    'symbols': ['BTC/USDT:USDT'],
+    'amount': {  # 各合约的交易数量 (基础币)
+        'BTC/USDT:USDT': 0.0001,
+        'ETH/USDT:USDT': 0.003,
+    },
     'leverage': 10,  # 杠杆倍数
     'timeframe': '15m',  # 使用15分钟K线
     'limit': 96, # 24 小时数据
     'test_mode': False,  # 测试模式
 }
 
-# 全局变量存储历史数据
-price_history = []
-signal_history = []
-position = None
+# 已完成的交易所设置（如杠杆），重启时据此跳过重复的设置请求
+STATE_FILE = Path('.okx_state.json')
+
+# 价格历史按合约持久化到内存映射文件，每行为 (ts, o, h, l, c, v)，重启后可恢复
+PRICE_HISTORY_LEN = 20
+PRICE_HISTORY_FILE = 'price_history_{}.bin'
+
+# 全局变量存储历史数据（按合约分开）
+price_history = {}
+signal_history = {symbol: [] for symbol in TRADE_CONFIG['symbols']}
+position = {}
+
+
+def symbol_key(symbol):
+    """合约符号转为prompt/JSON中使用的键，如 'BTC/USDT:USDT' -> 'BTCUSDT'"""
+    return symbol.split(':')[0].replace('/', '')
+
+
+def open_price_history(symbol):
+    """打开（或新建）合约的价格历史内存映射数组，时间戳为0的行表示空位"""
+    path = Path(PRICE_HISTORY_FILE.format(symbol_key(symbol)))
+    shape = (PRICE_HISTORY_LEN, 6)
+    expected_size = shape[0] * shape[1] * np.dtype(np.float64).itemsize
+    mode = 'r+' if path.exists() and path.stat().st_size == expected_size else 'w+'
+    return np.memmap(path, dtype=np.float64, mode=mode, shape=shape)
+
+
+def record_price_history(symbol, price_data):
+    """滚动写入最新一根K线，返回该合约已记录的收盘价序列"""
+    if symbol not in price_history:
+        price_history[symbol] = open_price_history(symbol)
+    history = price_history[symbol]
+
+    klines = price_data['kline_data']
+    history[:-1] = history[1:]
+    history[-1] = (
+        klines['timestamp'][-1].value // 10**6,
+        klines['open'][-1],
+        klines['high'][-1],
+        klines['low'][-1],
+        klines['close'][-1],
+        klines['volume'][-1],
+    )
+    history.flush()
+
+    return history[history[:, 0] > 0, 4]
+
+
+def load_exchange_state():
+    """读取本地缓存的交易所设置状态"""
+    try:
+        return json.loads(STATE_FILE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_exchange_state(state):
+    """保存交易所设置状态，供下次启动时复用"""
+    try:
+        STATE_FILE.write_text(json.dumps(state), encoding='utf-8')
+    except OSError as e:
+        print(f"保存交易所状态失败: {e}")
 
 
 def setup_exchange():
     """设置交易所参数"""
     try:
-        # OKX设置杠杆
-        exchange.set_leverage(
-            TRADE_CONFIG['leverage'],
-            TRADE_CONFIG['symbol'],
-            {'mgnMode': 'cross'}  # 全仓模式，也可用'isolated'逐仓
-        )
+        # OKX设置杠杆（上次运行已设置过的合约跳过，节省一次REST请求）
+        state = load_exchange_state()
+        leverage_state = state.setdefault('leverage', {})
+        for symbol in TRADE_CONFIG['symbols']:
+            if leverage_state.get(symbol) == TRADE_CONFIG['leverage']:
+                continue
+            exchange.set_leverage(
+                TRADE_CONFIG['leverage'],
+                symbol,
+                {'mgnMode': 'cross'}  # 全仓模式，也可用'isolated'逐仓
+            )
+            leverage_state[symbol] = TRADE_CONFIG['leverage']
+        save_exchange_state(state)
         print(f"设置杠杆倍数: {TRADE_CONFIG['leverage']}x")
 
         # 获取余额
@@ -57,7 +153,7 @@ def setup_exchange():
         print(f"当前USDT余额: {usdt_balance:.2f}")
 
         # 设置持仓模式 (双向持仓)
-        # exchange.set_position_mode(False, TRADE_CONFIG['symbol'])
+        # exchange.set_position_mode(False, symbol)
         print("设置单向持仓")
 
         return True
@@ -65,106 +161,60 @@ def setup_exchange():
         print(f"交易所设置失败: {e}")
         return False
 
-def calculate_technical_indicators(df):
-    """计算技术指标 - 来自第一个策略"""
-    try:
-        # MACD指标计算
-        # 计算快速和慢速EMA
-        df['ema_12'] = df['close'].ewm(span=12, adjust=False).mean()
-        df['ema_26'] = df['close'].ewm(span=26, adjust=False).mean()
-        # 计算MACD线（快线减慢线）
-        df['macd'] = df['ema_12'] - df['ema_26']
-        # 计算信号线（MACD的9日EMA）
-        df['macd_signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-        # 计算MACD柱状图
-        df['macd_histogram'] = df['macd'] - df['macd_signal']
-
-        # 相对强弱指数 (RSI-16)
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=16).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=16).mean()
-        rs = gain / loss
-        df['rsi_16'] = 100 - (100 / (1 + rs))  # RSI = 100 - (100 / (1 + RS))
-
-        # 布林带策略计算 (20日布林带)
-        # 计算中轨（20日简单移动平均）
-        df['bb_middle'] = df['close'].rolling(window=20).mean()
-        # 计算标准差
-        bb_std = df['close'].rolling(window=20).std()
-        # 计算上轨 (中轨 + 2倍标准差)
-        df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-        # 计算下轨 (中轨 - 2倍标准差)
-        df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-        # 计算带宽 ((上轨 - 下轨) / 中轨)
-        df['bb_bandwidth'] = (df['bb_upper'] - df['bb_lower']) / df['bb_middle']
-        # 计算%B指标 ((收盘价 - 下轨) / (上轨 - 下轨))
-        df['bb_percent_b'] = (df['close'] - df['bb_lower']) / (df['bb_upper'] - df['bb_lower'])
-
-        # 填充NaN值
-        df = df.bfill().ffill()
-
-        return df
-    except Exception as e:
-        print(f"技术指标计算失败: {e}")
-        return df
-
-
-
-def get_btc_ohlcv():
-    """获取BTC/USDT的K线数据"""
+def ohlcv_columns(ohlcv):
+    """将ccxt返回的 [[ts, o, h, l, c, v], ...] 转为按列连续存放的数组"""
+    arr = np.asarray(ohlcv, dtype=np.float64)
+    timestamp, open_, high, low, close, volume = arr.T.copy()
+    return {
+        'timestamp': pd.to_datetime(timestamp.astype(np.int64), unit='ms'),
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+    }
+
+
+def get_ohlcv(symbol):
+    """获取指定合约的K线数据"""
     try:
         # 获取最近10根K线
-        ohlcv = exchange.fetch_ohlcv(TRADE_CONFIG['symbol'], TRADE_CONFIG['timeframe'], limit=TRADE_CONFIG['limit'])
-        m_ohlcv = exchange.fetch_ohlcv(TRADE_CONFIG['symbol'], '1m', limit=100)
-        # 转换为DataFrame
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        ohlcv = exchange.fetch_ohlcv(symbol, TRADE_CONFIG['timeframe'], limit=TRADE_CONFIG['limit'])
+        m_ohlcv = exchange.fetch_ohlcv(symbol, '1m', limit=100)
+        klines = ohlcv_columns(ohlcv)
         # 一分钟
-        m_df = pd.DataFrame(m_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        m_df['timestamp'] = pd.to_datetime(m_df['timestamp'], unit='ms')
+        m_klines = ohlcv_columns(m_ohlcv)
 
-        current_data = df.iloc[-1]
-        previous_data = df.iloc[-2] if len(df) > 1 else current_data
+        close = klines['close']
+        previous_close = close[-2] if len(close) > 1 else close[-1]
 
-         # 计算技术指标
-        # df = calculate_technical_indicators(df)
         return {
-            'price': current_data['close'],
+            'symbol': symbol,
+            'price': close[-1],
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'high': current_data['high'],
-            'low': current_data['low'],
-            'volume': current_data['volume'],
+            'high': klines['high'][-1],
+            'low': klines['low'][-1],
+            'volume': klines['volume'][-1],
             'timeframe': TRADE_CONFIG['timeframe'],
-            'price_change': ((current_data['close'] - previous_data['close']) / previous_data['close']) * 100,
-            'kline_data': df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].to_dict('records'),
-            # 'kline_data': df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].tail(10).to_dict('records'),
-            "m_df":m_df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].to_dict('records'),
-            # 'technical_data': {
-            #     'rsi_16': df['rsi_16'].tail(10).tolist(),
-            #     'macd': df['macd'].tail(10).tolist(),
-            #     'macd_signal': df['macd_signal'].tail(10).tolist(),
-            #     'macd_histogram': df['macd_histogram'].tail(10).tolist(),
-            #     'bollinger_bands': {
-            #         'upper': df['bb_upper'].tail(10).tolist(),
-            #         'middle': df['bb_middle'].tail(10).tolist(),
-            #         'lower': df['bb_lower'].tail(10).tolist(),
-            #         'bandwidth': df['bb_bandwidth'].tail(10).tolist(),
-            #         'percent_b': df['bb_percent_b'].tail(10).tolist()
-            #     }
-            # },
+            'price_change': ((close[-1] - previous_close) / previous_close) * 100,
+            'kline_data': klines,
+            "m_df": m_klines,
         }
     except Exception as e:
-        print(f"获取K线数据失败: {e}")
+        print(f"获取{symbol} K线数据失败: {e}")
         return None
 
 
-def get_current_position():
-    """获取当前持仓情况"""
+def get_current_position(symbol, raise_errors=False):
+    """获取指定合约的当前持仓情况
+
+    raise_errors=True 时查询失败会抛出异常，而不是当作无持仓返回None
+    """
     try:
-        positions = exchange.fetch_positions([TRADE_CONFIG['symbol']])
+        positions = exchange.fetch_positions([symbol])
 
         for pos in positions:
-            if pos['symbol'] == TRADE_CONFIG['symbol']:
+            if pos['symbol'] == symbol:
                 contracts = float(pos['contracts']) if pos['contracts'] else 0
 
                 if contracts > 0:
@@ -179,32 +229,40 @@ def get_current_position():
 
         return None
 
-    except Exception as e:
-        print(f"获取持仓失败: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        if raise_errors:
+            raise
+        logger.exception("获取持仓失败")
         return None
 
 
-def analyze_with_deepseek(price_data):
-    """使用DeepSeek分析市场并生成交易信号"""
+def format_kline_text(title, klines):
+    """将按列存放的K线数据格式化为紧凑的CSV文本，减少prompt的token数
+
+    t为K线序号（0为最早一根，起始时间写在标题里），价格在万元以上时取整。
+    """
+    decimals = 0 if klines['close'][-1] >= 10000 else 2
+    rows = "\n".join(
+        f"{i},{o:.{decimals}f},{h:.{decimals}f},{l:.{decimals}f},{c:.{decimals}f},{v:.1f}"
+        for i, (o, h, l, c, v) in enumerate(zip(
+            klines['open'].tolist(), klines['high'].tolist(), klines['low'].tolist(),
+            klines['close'].tolist(), klines['volume'].tolist()
+        ))
+    )
+    return f"{title} 起始时间: {klines['timestamp'][0]}\n```csv\nt,o,h,l,c,v\n{rows}\n```\n"
+
+
+def build_symbol_section(symbol, price_data, current_pos):
+    """构建单个合约的行情数据段落"""
+    closes = record_price_history(symbol, price_data)
 
-    # 添加当前价格到历史记录
-    price_history.append(price_data)
-    if len(price_history) > 20:
-        price_history.pop(0)
+    base = symbol.split('/')[0]
 
     # 构建K线数据文本
-    kline_text = f"【最近100根{TRADE_CONFIG['timeframe']}K线数据】\n"
-    for i, kline in enumerate(price_data['kline_data']):
-        print(kline)
-        trend = "阳线" if kline['close'] > kline['open'] else "阴线"
-        change = ((kline['close'] - kline['open']) / kline['open']) * 100
-        kline_text += f"K线{i + 1}: {trend} 时间: {kline['timestamp']} 开盘:{kline['open']:.2f} 收盘:{kline['close']:.2f} 最高价:{kline['high']} 最低价: {kline['low']} 涨跌:{change:+.2f}%\n"
+    kline_text = format_kline_text(f"【最近100根{TRADE_CONFIG['timeframe']}K线数据】", price_data['kline_data'])
     # 构建技术指标文本
-    if len(price_history) >= 5:
-        closes = [data['price'] for data in price_history[-5:]]
-        sma_5 = sum(closes) / len(closes)
+    if len(closes) >= 5:
+        sma_5 = float(closes[-5:].mean())
         price_vs_sma = ((price_data['price'] - sma_5) / sma_5) * 100
 
         indicator_text = f"【技术指标】\n5周期均价: {sma_5:.2f}\n当前价格相对于均线: {price_vs_sma:+.2f}%"
@@ -212,24 +270,19 @@ def analyze_with_deepseek(price_data):
         indicator_text = "【技术指标】\n数据不足计算技术指标"
 
     # 最近1m的k线数据
-    kline_text_1m = f"【最近100根1mK线数据】\n"
-    for i, kline in enumerate(price_data['m_df']):
-        trend = "阳线" if kline['close'] > kline['open'] else "阴线"
-        change = ((kline['close'] - kline['open']) / kline['open']) * 100
-        kline_text_1m += f"K线{i + 1}: {trend} 时间: {kline['timestamp']} 开盘:{kline['open']:.2f} 收盘:{kline['close']:.2f} 最高价:{kline['high']} 最低价: {kline['low']} 涨跌:{change:+.2f}%\n"
+    kline_text_1m = format_kline_text("【最近100根1mK线数据】", price_data['m_df'])
 
     # 添加上次交易信号
     signal_text = ""
-    if signal_history:
-        last_signal = signal_history[-1]
+    if signal_history[symbol]:
+        last_signal = signal_history[symbol][-1]
         signal_text = f"\n【上次交易信号】\n信号: {last_signal.get('signal', 'N/A')}\n信心: {last_signal.get('confidence', 'N/A')}"
 
     # 添加当前持仓信息
-    current_pos = get_current_position()
     position_text = "无持仓" if not current_pos else f"{current_pos['side']}仓, 数量: {current_pos['size']}, 盈亏: {current_pos['unrealized_pnl']:.2f}USDT"
 
-    prompt = f"""
-    你是一个专业的加密货币交易分析师。请基于以下BTC/USDT {TRADE_CONFIG['timeframe']}周期数据进行分析：
+    return f"""
+    ==================== {symbol_key(symbol)} ({symbol}) ====================
 
     {kline_text}
 
@@ -244,9 +297,31 @@ def analyze_with_deepseek(price_data):
     - 时间: {price_data['timestamp']}
     - 本K线最高: ${price_data['high']:,.2f}
     - 本K线最低: ${price_data['low']:,.2f}
-    - 本K线成交量: {price_data['volume']:.2f} BTC
+    - 本K线成交量: {price_data['volume']:.2f} {base}
     - 价格变化: {price_data['price_change']:+.2f}%
     - 当前持仓: {position_text}
+    """
+
+
+def analyze_with_deepseek(price_data_map, current_positions):
+    """使用DeepSeek一次性分析所有合约并生成交易信号
+
+    所有合约的行情拼进同一个prompt，共享分析要求等前缀，只发一次请求。
+    current_positions 为本轮已查询的 {合约符号: 持仓}，避免重复请求交易所。
+
+    Returns:
+        {合约符号: 信号字典}，解析失败返回None
+    """
+    sections = "\n".join(
+        build_symbol_section(symbol, price_data, current_positions.get(symbol))
+        for symbol, price_data in price_data_map.items()
+    )
+    keys = [symbol_key(symbol) for symbol in price_data_map]
+
+    prompt = f"""
+    你是一个专业的加密货币交易分析师。请基于以下各合约 {TRADE_CONFIG['timeframe']}周期数据分别进行分析：
+
+    {sections}
 
 
     【防频繁交易重要原则】
@@ -257,7 +332,11 @@ def analyze_with_deepseek(price_data):
 
 
 
+    【数据格式】
+    K线数据为CSV表格: t=K线序号(0为最早一根，按周期递增), o=开盘价, h=最高价, l=最低价, c=收盘价, v=成交量
+
     【分析要求】
+    对以下每个合约分别完成: {', '.join(keys)}
     1. 基于{TRADE_CONFIG['timeframe']}K线趋势以及1mk线趋势,你需要根据k线数据计算出macd,rsi,动量等指标
     2. 基于15mk和指标判断当前的趋势,再根据1mk线分析当前对否一个合理的交易点位,并给出交易信号: BUY(买入) / SELL(卖出) / HOLD(观望)
     3. 简要分析理由（考虑趋势连续性、支撑阻力、成交量等因素）
@@ -266,15 +345,18 @@ def analyze_with_deepseek(price_data):
     6. 评估信号信心程度
     7. 给出达到止盈止损的大概时间(需要持仓多久)
 
-    请用以下JSON格式回复：
+    请用以下JSON格式回复，按合约键名分别给出：
     {{
-        "signal": "BUY|SELL|HOLD",
-        "reason": "分析理由",
-        "stop_loss": int(具体价格),
-        "take_profit": int(具体价格),
-        "hold_time": 预期持仓时间,
-        "confidence": "HIGH|MEDIUM|LOW"
-        "technical":"技术指标分析"
+        "{keys[0]}": {{
+            "signal": "BUY|SELL|HOLD",
+            "reason": "分析理由",
+            "stop_loss": int(具体价格),
+            "take_profit": int(具体价格),
+            "hold_time": 预期持仓时间,
+            "confidence": "HIGH|MEDIUM|LOW"
+            "technical":"技术指标分析"
+        }},
+        ...
     }}
     """
     print("-"*30)
@@ -296,22 +378,29 @@ def analyze_with_deepseek(price_data):
 
         # 安全解析JSON
         result = response.choices[0].message.content
-        start_idx = result.find('{')
-        end_idx = result.rfind('}') + 1
-        if start_idx != -1 and end_idx != 0:
-            json_str = result[start_idx:end_idx]
-            signal_data = json.loads(json_str)
+        match = _JSON_RE.search(result)
+        if match:
+            response_data = _json_loads(match.group())
         else:
             print(f"无法解析JSON: {result}")
             return None
 
-        # 保存信号到历史记录
-        signal_data['timestamp'] = price_data['timestamp']
-        signal_history.append(signal_data)
-        if len(signal_history) > 30:
-            signal_history.pop(0)
+        signals = {}
+        for symbol, price_data in price_data_map.items():
+            signal_data = response_data.get(symbol_key(symbol))
+            if not signal_data:
+                print(f"{symbol} 未返回交易信号")
+                continue
+
+            # 保存信号到历史记录
+            signal_data['timestamp'] = price_data['timestamp']
+            history = signal_history[symbol]
+            history.append(signal_data)
+            if len(history) > 30:
+                history.pop(0)
+            signals[symbol] = signal_data
 
-        return signal_data
+        return signals
 
     except Exception as e:
         print(f"DeepSeek分析失败: {e}")
@@ -319,13 +408,37 @@ def analyze_with_deepseek(price_data):
         return None
 
 
-def execute_trade(signal_data, price_data):
-    """执行交易"""
-    global position
+def wait_for_fill(order, symbol, timeout=5.0, interval=0.05):
+    """轮询订单状态直到成交（或超时），替代固定的等待时间
 
-    current_position = get_current_position()
+    查询订单出错（如网络异常）时记录日志并继续轮询，直到超时
 
-    print(f"交易信号: {signal_data['signal']}")
+    Returns:
+        订单是否已确认成交
+    """
+    deadline = time.monotonic() + timeout
+    status = None
+    while True:
+        try:
+            status = exchange.fetch_order(order['id'], symbol).get('status')
+        except Exception:
+            logger.exception("查询订单 %s 状态失败", order['id'])
+        if status == 'closed':
+            return True
+        if status in ('canceled', 'rejected', 'expired'):
+            print(f"订单 {order['id']} 未成交: {status}")
+            return False
+        if time.monotonic() >= deadline:
+            print(f"等待订单 {order['id']} 成交超时 (状态: {status})")
+            return False
+        time.sleep(interval)
+
+
+def execute_trade(symbol, signal_data, price_data, current_position):
+    """执行交易"""
+    amount = TRADE_CONFIG['amount'][symbol]
+
+    print(f"[{symbol}] 交易信号: {signal_data['signal']}")
     print(f"信心程度: {signal_data['confidence']}")
     print(f"理由: {signal_data['reason']}")
     print(f"止损: ${signal_data['stop_loss']:,.2f}")
@@ -343,26 +456,29 @@ def execute_trade(signal_data, price_data):
             if current_position and current_position['side'] == 'short':
                 print("平空仓并开多仓...")
                 # 平空仓
-                exchange.create_market_order(
-                    TRADE_CONFIG['symbol'],
+                close_order = exchange.create_market_order(
+                    symbol,
                     'buy',
                     current_position['size'],
                     params={'reduceOnly': True, 'tag': 'f1ee03b510d5SUDE'}
                 )
-                time.sleep(1)
+                if not wait_for_fill(close_order, symbol):
+                    # 平仓未确认成交时不开反向仓，避免双倍或对冲持仓
+                    logger.error("[%s] 平仓单 %s 未确认成交，跳过开多仓", symbol, close_order['id'])
+                    return
                 # 开多仓
                 exchange.create_market_order(
-                    TRADE_CONFIG['symbol'],
+                    symbol,
                     'buy',
-                    TRADE_CONFIG['amount'],
+                    amount,
                     params={'tag': 'f1ee03b510d5SUDE'}
                 )
             elif not current_position:
                 print("开多仓...")
                 exchange.create_market_order(
-                    TRADE_CONFIG['symbol'],
+                    symbol,
                     'buy',
-                    TRADE_CONFIG['amount'],
+                    amount,
                     params={'tag': 'f1ee03b510d5SUDE'}
                 )
             else:
@@ -372,26 +488,29 @@ def execute_trade(signal_data, price_data):
             if current_position and current_position['side'] == 'long':
                 print("平多仓并开空仓...")
                 # 平多仓
-                exchange.create_market_order(
-                    TRADE_CONFIG['symbol'],
+                close_order = exchange.create_market_order(
+                    symbol,
                     'sell',
                     current_position['size'],
                     params={'reduceOnly': True, 'tag': 'f1ee03b510d5SUDE'}
                 )
-                time.sleep(1)
+                if not wait_for_fill(close_order, symbol):
+                    # 平仓未确认成交时不开反向仓，避免双倍或对冲持仓
+                    logger.error("[%s] 平仓单 %s 未确认成交，跳过开空仓", symbol, close_order['id'])
+                    return
                 # 开空仓
                 exchange.create_market_order(
-                    TRADE_CONFIG['symbol'],
+                    symbol,
                     'sell',
-                    TRADE_CONFIG['amount'],
+                    amount,
                     params={'tag': 'f1ee03b510d5SUDE'}
                 )
             elif not current_position:
                 print("开空仓...")
                 exchange.create_market_order(
-                    TRADE_CONFIG['symbol'],
+                    symbol,
                     'sell',
-                    TRADE_CONFIG['amount'],
+                    amount,
                     params={'tag': 'f1ee03b510d5SUDE'}
                 )
             else:
@@ -404,13 +523,11 @@ def execute_trade(signal_data, price_data):
         print("订单执行成功")
         # 更新持仓信息
         time.sleep(2)
-        position = get_current_position()
-        print(f"更新后持仓: {position}")
+        position[symbol] = get_current_position(symbol)
+        print(f"更新后持仓: {position[symbol]}")
 
-    except Exception as e:
-        print(f"订单执行失败: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("订单执行失败")
 
 
 def trading_bot():
@@ -419,28 +536,75 @@ def trading_bot():
     print(f"执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
 
-    # 1. 获取K线数据
-    price_data = get_btc_ohlcv()
-    if not price_data:
+    # 1. 并发获取所有合约的K线数据
+    symbols = TRADE_CONFIG['symbols']
+    with ThreadPoolExecutor(max_workers=len(symbols)) as executor:
+        fetched = dict(zip(symbols, executor.map(get_ohlcv, symbols)))
+    price_data_map = {symbol: data for symbol, data in fetched.items() if data}
+    if not price_data_map:
         return
 
-    print(f"BTC当前价格: ${price_data['price']:,.2f}")
+    for symbol, price_data in price_data_map.items():
+        print(f"{symbol} 当前价格: ${price_data['price']:,.2f}")
     print(f"数据周期: {TRADE_CONFIG['timeframe']}")
     # print(f"价格变化: {price_data['price_change']:+.2f}%")
 
-    # 2. 使用DeepSeek分析
-    signal_data = analyze_with_deepseek(price_data)
-    if not signal_data:
+    # 2. 查询持仓（本轮只查一次，分析和下单共用）
+    current_positions = {symbol: get_current_position(symbol) for symbol in price_data_map}
+
+    # 3. 使用DeepSeek一次性分析所有合约
+    signals = analyze_with_deepseek(price_data_map, current_positions)
+    if not signals:
         return
 
-    # 3. 执行交易
-    execute_trade(signal_data, price_data)
+    # 4. 执行交易
+    # DeepSeek请求耗时较长，期间可能已成交/强平/手动平仓，下单前重新查询持仓
+    for symbol, signal_data in signals.items():
+        current_position = current_positions[symbol]
+        if signal_data.get('signal') in ('BUY', 'SELL'):
+            try:
+                current_position = get_current_position(symbol, raise_errors=True)
+            except Exception:
+                logger.exception("[%s] 下单前查询持仓失败，跳过本轮交易", symbol)
+                continue
+        execute_trade(symbol, signal_data, price_data_map[symbol], current_position)
+
+
+def setup_logging():
+    """日志同时输出到控制台和滚动日志文件（10MB × 3份），在main()启动时调用"""
+    if logger.handlers:
+        return
+    os.makedirs('logs', exist_ok=True)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    for handler in (
+        logging.StreamHandler(),
+        RotatingFileHandler('logs/okx_bot.log', maxBytes=10_000_000, backupCount=3),
+    ):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def seconds_until_next_run(now=None):
+    """距离下一个执行点的秒数
+
+    15m周期对齐到每个整15分钟后1秒，其余周期在每小时的第01分执行。
+    """
+    now = now or datetime.now()
+    if TRADE_CONFIG['timeframe'] == '15m':
+        minute = (now.minute // 15 + 1) * 15
+        target = now.replace(minute=0, second=1, microsecond=0) + timedelta(minutes=minute)
+    else:
+        target = now.replace(minute=1, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(hours=1)
+    return (target - now).total_seconds()
 
 
 def main():
     """主函数"""
-    print("BTC/USDT OKX自动交易机器人启动成功！")
-    ac = exchange.fetch_balance()
+    setup_logging()
+    print(f"{', '.join(TRADE_CONFIG['symbols'])} OKX自动交易机器人启动成功！")
 
     if TRADE_CONFIG['test_mode']:
         print("当前为模拟模式，不会真实下单")
@@ -457,24 +621,18 @@ def main():
     
 
     # 根据时间周期设置执行频率
-    if TRADE_CONFIG['timeframe'] == '1h':
-        schedule.every().hour.at(":01").do(trading_bot)
-        print("执行频率: 每小时一次")
-    elif TRADE_CONFIG['timeframe'] == '15m':
-        schedule.every(15).minutes.do(trading_bot)
+    if TRADE_CONFIG['timeframe'] == '15m':
         print("执行频率: 每15分钟一次")
     else:
-        schedule.every().hour.at(":01").do(trading_bot)
         print("执行频率: 每小时一次")
 
     # 立即执行一次
     trading_bot()
 
-    # 循环执行
+    # 循环执行：直接睡到下一个执行点，不再每秒轮询
     while True:
-        schedule.run_pending()
-        time.sleep(1)
-
+        time.sleep(seconds_until_next_run())
+        trading_bot()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -21,13 +21,14 @@ from utils.data_fetcher import BinanceDataFetcher
 class TestTechnicalIndicators(unittest.TestCase):
     """测试技术指标计算"""
     
-    def setUp(self):
-        """初始化测试数据"""
-        self.tech = TechnicalIndicators()
+    @classmethod
+    def setUpClass(cls):
+        """初始化测试数据（只读，整个类共享）"""
+        cls.tech = TechnicalIndicators()
         
         # 创建模拟K线数据（100根）
         np.random.seed(42)
-        self.test_df = pd.DataFrame({
+        cls.test_df = pd.DataFrame({
             'open': np.random.randn(100) * 100 + 50000,
             'high': np.random.randn(100) * 100 + 50100,
             'low': np.random.randn(100) * 100 + 49900,
@@ -36,12 +37,15 @@ class TestTechnicalIndicators(unittest.TestCase):
         })
         
         # 确保high >= close >= low
-        self.test_df['high'] = self.test_df[['open', 'close', 'high']].max(axis=1)
-        self.test_df['low'] = self.test_df[['open', 'close', 'low']].min(axis=1)
+        cls.test_df['high'] = cls.test_df[['open', 'close', 'high']].max(axis=1)
+        cls.test_df['low'] = cls.test_df[['open', 'close', 'low']].min(axis=1)
+        
+        # 同一输入只计算一次指标，各断言共享结果
+        cls.result = cls.tech.calculate_all(cls.test_df)
     
     def test_calculate_all(self):
         """测试计算所有指标"""
-        result = self.tech.calculate_all(self.test_df)
+        result = self.result
         
         # 检查返回的键
         self.assertIn('macd_line', result)
@@ -65,7 +69,7 @@ class TestTechnicalIndicators(unittest.TestCase):
     
     def test_rsi_range(self):
         """测试RSI范围在0-100之间"""
-        result = self.tech.calculate_all(self.test_df)
+        result = self.result
         rsi = result['rsi']
         
         self.assertGreaterEqual(rsi, 0)
@@ -75,7 +79,7 @@ class TestTechnicalIndicators(unittest.TestCase):
     
     def test_bb_position_range(self):
         """测试布林带位置在0-1之间"""
-        result = self.tech.calculate_all(self.test_df)
+        result = self.result
         bb_pos = result['bb_position']
         
         self.assertGreaterEqual(bb_pos, 0)
@@ -85,7 +89,7 @@ class TestTechnicalIndicators(unittest.TestCase):
     
     def test_ema_trend_values(self):
         """测试EMA趋势值在-1,0,1之间"""
-        result = self.tech.calculate_all(self.test_df)
+        result = self.result
         ema_trend = result['ema_trend']
         
         self.assertIn(ema_trend, [-1, 0, 1])
@@ -107,21 +111,22 @@ class TestTechnicalIndicators(unittest.TestCase):
 class TestSupportResistance(unittest.TestCase):
     """测试支撑阻力识别"""
     
-    def setUp(self):
-        """初始化测试数据"""
-        self.sr_finder = SupportResistanceFinder()
+    @classmethod
+    def setUpClass(cls):
+        """初始化测试数据（只读，整个类共享）"""
+        cls.sr_finder = SupportResistanceFinder()
         
         # 创建有明显支撑阻力的数据
-        prices = [50000 + i*10 + np.random.randn()*50 for i in range(100)]
-        self.test_df = pd.DataFrame({
+        prices = 50000 + np.arange(100) * 10 + np.random.randn(100) * 50
+        cls.test_df = pd.DataFrame({
             'open': prices,
-            'high': [p + abs(np.random.randn()*100) for p in prices],
-            'low': [p - abs(np.random.randn()*100) for p in prices],
+            'high': prices + np.abs(np.random.randn(100)) * 100,
+            'low': prices - np.abs(np.random.randn(100)) * 100,
             'close': prices,
             'volume': np.random.randn(100) * 1000 + 10000
         })
         
-        self.current_price = 50500
+        cls.current_price = 50500
     
     def test_find_levels(self):
         """测试找到支撑阻力位"""
@@ -182,13 +187,14 @@ class TestMultiTimeframeAnalyzer(unittest.TestCase):
 class TestDataIntegration(unittest.TestCase):
     """测试数据整合（包含Phase2的12个新维度）"""
     
-    def setUp(self):
-        """初始化"""
+    @classmethod
+    def setUpClass(cls):
+        """初始化（只读，整个类共享）"""
         from utils.data_integrator import DataIntegrator
-        self.integrator = DataIntegrator()
+        cls.integrator = DataIntegrator()
         
         # 准备测试数据
-        self.tech_indicators = {
+        cls.tech_indicators = {
             'macd_line': 10.5,
             'macd_signal': 8.3,
             'macd_hist': 2.2,
@@ -197,7 +203,7 @@ class TestDataIntegration(unittest.TestCase):
             'ema_trend': 1
         }
         
-        self.multi_timeframe = {
+        cls.multi_timeframe = {
             'timeframes': {
                 '1m': {'trend': 1, 'rsi': 60},
                 '15m': {'trend': 1, 'rsi': 62},
@@ -208,7 +214,7 @@ class TestDataIntegration(unittest.TestCase):
             'overall_trend': 1
         }
         
-        self.support_resistance = {
+        cls.support_resistance = {
             'nearest_support': 49500,
             'nearest_resistance': 51000,
             'support_distance': 1.5,
@@ -6,6 +6,7 @@
 
 import sys
 import logging
+import numpy as np
 from strategies import (
     TrendFollowingStrategy,
     MeanReversionStrategy,
@@ -37,53 +38,70 @@ def test_all_strategies():
     scenarios = [
         {
             'name': '场景1: 强上涨趋势',
-            'features': [
+            'features': np.array([
                 15.0, 8.0, 1, 1, 50000, 3.5, 1500000, 0.020, 1,
                 51500, 48500, 49000, 0.68, 0.40, 0.10, 18, 1,
                 0.80, 0.75, 60, 1, 0.80, 3, 0, 1.0, 1
-            ],
+            ], dtype=np.float64),
             'metadata': {'current_price': 50000, 'avg_volume': 1000000}
         },
         {
             'name': '场景2: 强下跌趋势',
-            'features': [
+            'features': np.array([
                 15.0, 8.0, 1, 1, 50000, -3.2, 1200000, 0.025, -1,
                 50500, 48000, 50300, 0.32, 0.12, 0.40, 15, -1,
                 0.75, 0.70, 35, -1, 0.78, 0, 3, 1.0, -1
-            ],
+            ], dtype=np.float64),
             'metadata': {'current_price': 50000, 'avg_volume': 1000000}
         },
         {
             'name': '场景3: 震荡市场',
-            'features': [
+            'features': np.array([
                 15.0, 8.0, 1, 1, 50000, 0.3, 1000000, 0.015, 0,
                 50300, 49700, 50000, 0.50, 0.25, 0.20, 10, 0,
                 0.65, 0.60, 50, 0, 0.65, 1, 1, 0.50, 0
-            ],
+            ], dtype=np.float64),
             'metadata': {'current_price': 50000, 'avg_volume': 1000000}
         },
         {
             'name': '场景4: 超卖反弹',
-            'features': [
+            'features': np.array([
                 15.0, 8.0, 1, 1, 50000, -4.5, 1800000, 0.035, -1,
                 51000, 47500, 50800, 0.28, 0.10, 0.45, 20, -1,
                 0.70, 0.75, 28, -1, 0.75, 0, 3, 1.0, -1
-            ],
+            ], dtype=np.float64),
             'metadata': {'current_price': 50000, 'avg_volume': 1000000}
         },
         {
             'name': '场景5: 向上突破',
-            'features': [
+            'features': np.array([
                 15.0, 8.0, 1, 1, 50000, 2.2, 1600000, 0.018, 1,
                 50100, 49000, 49200, 0.65, 0.35, 0.12, 16, 1,
                 0.75, 0.72, 58, 1, 0.78, 2, 1, 0.75, 1
-            ],
+            ], dtype=np.float64),
             'metadata': {'current_price': 50000, 'avg_volume': 1000000}
         }
     ]
     
+    # 所有场景的特征组成 (N, F) 矩阵，每个策略一次批量分析
+    features_mat = np.stack([s['features'] for s in scenarios])
+    metas = [s['metadata'] for s in scenarios]
+    
+    batch_signals = {}
+    for name, strategy in strategies.items():
+        try:
+            batch_signals[name] = strategy.batch_analyze(features_mat, metas)
+        except Exception as e:
+            batch_signals[name] = e
+            continue
+        
+        # 批量结果应与逐行分析一致
+        assert batch_signals[name] == [
+            strategy.analyze(f, m) for f, m in zip(features_mat.tolist(), metas)
+        ]
+    
     # 测试每个场景
-    for scenario in scenarios:
+    for i, scenario in enumerate(scenarios):
         print(f"\n{'='*80}")
         print(f"📋 {scenario['name']}")
         print(f"{'='*80}")
@@ -96,15 +114,18 @@ def test_all_strategies():
         print(f"  价格: ${metadata['current_price']:,}")
         print(f"  24h涨跌: {features[5]:.2f}%")
         print(f"  波动率: {features[7]*100:.2f}%")
-        print(f"  趋势: {features[8]}")
+        print(f"  趋势: {features[8]:.0f}")
         
         # 测试每个策略
         print(f"\n策略信号:")
         results = {}
         
-        for name, strategy in strategies.items():
+        for name in strategies:
             try:
-                signal = strategy.analyze(features, metadata)
+                signals = batch_signals[name]
+                if isinstance(signals, Exception):
+                    raise signals
+                signal = signals[i]
                 
                 if signal and signal['signal'] != 'NEUTRAL':
                     emoji = "🟢" if signal['signal'] == 'LONG' else "🔴"
@@ -4,13 +4,57 @@
 数据获取模块 - 从Binance获取实时K线数据
 """
 
+import asyncio
+import hashlib
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
 import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
+# orjson解析更快（可选），未安装时回退到标准库json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Redis可选：多个进程共享Binance原始响应（设置 REDIS_URL 后启用）
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# pyarrow可选：列式写入CSV/Parquet，未安装时使用pandas.to_csv
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# httpx可选：提供异步批量获取，未安装时使用线程池
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# HTTP/2需要额外安装 h2（pip install "httpx[http2]"）
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # 设置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -18,25 +62,155 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 内存缓存有效期（秒）：同一tick内的重复请求直接返回缓存
+PRICE_CACHE_TTL = 1.0
+KLINES_CACHE_MAX_TTL = 60.0
+
+# Redis共享缓存TTL（秒）；K线按下一根K线开始时间对齐，同进程内缓存
+SHARED_PRICE_TTL = 1
+
+# 单个交易对 /api/v3/ticker/price 的请求权重
+PRICE_WEIGHT = 2
+
+# K线间隔单位 -> 秒
+_INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'M': 2592000}
+
+
+def interval_to_seconds(interval: str) -> int:
+    """K线间隔转为秒数，如 "1m" -> 60, "4h" -> 14400"""
+    return int(interval[:-1]) * _INTERVAL_UNITS[interval[-1]]
+
+
+class RateLimiter:
+    """滑动窗口限流器：任意 window 秒内请求权重之和不超过 max_weight（线程安全）"""
+    
+    def __init__(self, max_weight: int, window: float):
+        self.max_weight = max_weight
+        self.window = window
+        self._calls = deque()  # (时间, 权重)
+        self._used = 0
+        self._lock = threading.Lock()
+    
+    def _purge(self, now: float):
+        """移出窗口外的请求记录（需持有锁）"""
+        while self._calls and now - self._calls[0][0] >= self.window:
+            self._used -= self._calls.popleft()[1]
+    
+    def _try_acquire(self, weight: int) -> float:
+        """尝试获取配额：成功返回0，否则返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            
+            # 窗口为空时总是放行，避免单次权重超过上限时永远等待
+            if self._used + weight <= self.max_weight or not self._calls:
+                self._calls.append((now, weight))
+                self._used += weight
+                return 0.0
+            
+            return self.window - (now - self._calls[0][0])
+    
+    def acquire(self, weight: int = 1):
+        """获取一次请求配额，超出限额时阻塞等待"""
+        while (wait := self._try_acquire(weight)) > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self, weight: int = 1):
+        """异步版本：等待时让出事件循环"""
+        while (wait := self._try_acquire(weight)) > 0:
+            await asyncio.sleep(wait)
+    
+    def sync(self, used_weight: int):
+        """
+        按服务端返回的已用权重校正本地计数
+        
+        服务端计数更高时（其他进程/IP共享额度），补记差额；更低时不回退，保持保守
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            if used_weight > self._used:
+                self._calls.append((now, used_weight - self._used))
+                self._used = used_weight
+
+
+def klines_weight(limit: int) -> int:
+    """Binance K线接口的请求权重（随limit分档）"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def _in_event_loop() -> bool:
+    """当前线程是否正在运行事件循环（此时不能再调用 asyncio.run）"""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
 
 class BinanceDataFetcher:
     """Binance数据获取器 - 获取实时K线数据"""
     
-    def __init__(self, base_url: str = "https://api.binance.com"):
+    def __init__(self, base_url: str = "https://api.binance.com", redis_url: Optional[str] = None):
         """
         初始化数据获取器
         
         Args:
             base_url: Binance API基础URL
+            redis_url: Redis共享缓存地址，默认读取环境变量 REDIS_URL，未设置时不启用
         """
         self.base_url = base_url
         self.klines_endpoint = f"{base_url}/api/v3/klines"
         
+        # 复用连接（HTTP keep-alive），并发请求共享连接池；429/5xx自动退避重试
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=16, pool_maxsize=16)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # Binance限制: 每分钟请求权重1200
+        self.rate_limiter = RateLimiter(max_weight=1200, window=60.0)
+        
+        # 短TTL缓存: symbol -> (过期时间, 价格); (symbol, interval, limit) -> [过期时间, 列数组, DataFrame]
+        self._price_cache = {}
+        self._klines_cache = {}
+        self._cache_lock = threading.Lock()
+        
+        # 进行中的请求: key -> Future，并发的相同请求只发一次
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        
+        # 进程间共享缓存：保存原始响应字节，命中时跳过HTTP请求和限流配额
+        self.redis = None
+        redis_url = redis_url or os.getenv("REDIS_URL")
+        if redis_url and REDIS_AVAILABLE:
+            self.redis = redis.Redis.from_url(redis_url)
+    
+    @staticmethod
+    def _klines_expiry(interval: str, now: float) -> float:
+        """K线缓存过期时间：对齐到下一根K线开始，最长 KLINES_CACHE_MAX_TTL 秒"""
+        seconds = interval_to_seconds(interval)
+        next_open = (now // seconds + 1) * seconds
+        return min(next_open, now + KLINES_CACHE_MAX_TTL)
+        
     def fetch_klines(
         self, 
         symbol: str, 
         interval: str = "1m", 
-        limit: int = 100
+        limit: int = 100,
+        cache_bypass: bool = False
     ) -> Optional[pd.DataFrame]:
         """
         获取K线数据
@@ -45,6 +219,7 @@ class BinanceDataFetcher:
             symbol: 交易对符号，如 "BTCUSDT"
             interval: K线间隔，如 "1m", "5m", "15m"
             limit: 获取的K线数量，默认100
+            cache_bypass: 为True时跳过缓存直接请求（结果仍会写入缓存）
             
         Returns:
             包含K线数据的DataFrame，如果失败返回None
@@ -62,6 +237,63 @@ class BinanceDataFetcher:
             - taker_buy_base: 主动买入成交量
             - taker_buy_quote: 主动买入成交额
         """
+        key = (symbol, interval, limit)
+        now = time.time()
+        cached = None if cache_bypass else self._cached_klines(key, now)
+        if cached is not None:
+            return cached
+        
+        columns = self._coalesce(
+            ('klines', symbol, interval, limit, cache_bypass),
+            lambda: self._request_columns(symbol, interval, limit, now, cache_bypass)
+        )
+        if columns is None:
+            return None
+        
+        df = pd.DataFrame(columns)
+        self._store_klines(key, interval, now, columns, df)
+        return df.copy()
+    
+    def fetch_klines_raw(
+        self,
+        symbol: str,
+        interval: str = "1m",
+        limit: int = 100,
+        cache_bypass: bool = False
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        获取K线数据的列数组（不构造DataFrame），供只需要个别列的分析器使用
+        
+        与 fetch_klines 共享缓存；返回的数组为只读，需要修改时请先 .copy()
+        
+        Returns:
+            列名 -> numpy数组 的字典（列同 fetch_klines），失败返回None
+        """
+        key = (symbol, interval, limit)
+        now = time.time()
+        cached = None if cache_bypass else self._cached_columns(key, now)
+        if cached is not None:
+            return cached
+        
+        columns = self._coalesce(
+            ('klines', symbol, interval, limit, cache_bypass),
+            lambda: self._request_columns(symbol, interval, limit, now, cache_bypass)
+        )
+        if columns is None:
+            return None
+        
+        self._store_klines(key, interval, now, columns)
+        return dict(columns)
+    
+    def _request_columns(
+        self,
+        symbol: str,
+        interval: str,
+        limit: int,
+        now: float,
+        cache_bypass: bool = False
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """请求K线接口（先查Redis共享缓存）并解析为列数组，失败返回None"""
         try:
             # 构造请求参数
             params = {
@@ -69,61 +301,231 @@ class BinanceDataFetcher:
                 "interval": interval,
                 "limit": limit
             }
+            shared_key = self._shared_key("klines", params)
+            content = None if cache_bypass else self._shared_get(shared_key)
             
-            logger.info(f"正在获取 {symbol} 的 {interval} K线数据，数量: {limit}")
-            
-            # 发送请求
-            response = requests.get(
-                self.klines_endpoint,
-                params=params,
-                timeout=10
-            )
-            
-            # 检查响应
-            if response.status_code != 200:
-                logger.error(f"API请求失败: {response.status_code} - {response.text}")
-                return None
+            if content is None:
+                logger.info("正在获取 %s 的 %s K线数据，数量: %s", symbol, interval, limit)
+                
+                # 发送请求
+                self.rate_limiter.acquire(klines_weight(limit))
+                response = self.session.get(
+                    self.klines_endpoint,
+                    params=params,
+                    timeout=10
+                )
+                self._sync_used_weight(response)
+                
+                # 检查响应
+                if response.status_code != 200:
+                    logger.error("API请求失败: %s - %s", response.status_code, response.text)
+                    return None
+                
+                content = response.content
+                self._shared_set(shared_key, self._klines_expiry(interval, now) - now, content)
             
             # 解析数据
-            klines = response.json()
+            klines = json_loads(content)
             
             if not klines:
-                logger.warning(f"未获取到 {symbol} 的数据")
+                logger.warning("未获取到 %s 的数据", symbol)
                 return None
             
-            # 转换为DataFrame
-            df = pd.DataFrame(klines, columns=[
-                'open_time', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 
-                'taker_buy_base', 'taker_buy_quote', 'ignore'
-            ])
+            columns = self._parse_to_columns(klines)
+            logger.info("成功获取 %s 条 %s K线数据", len(klines), symbol)
             
-            # 数据类型转换
-            df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-            df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+            return columns
             
-            # 价格和成交量转为浮点数
-            price_columns = ['open', 'high', 'low', 'close', 'volume', 
-                           'quote_volume', 'taker_buy_base', 'taker_buy_quote']
-            for col in price_columns:
-                df[col] = df[col].astype(float)
+        except requests.exceptions.RequestException as e:
+            logger.error("网络请求错误: %s", e)
+            return None
+        except Exception as e:
+            logger.error("数据获取错误: %s", e)
+            return None
+    
+    async def fetch_klines_async(
+        self,
+        symbol: str,
+        interval: str = "1m",
+        limit: int = 100,
+        client: "httpx.AsyncClient" = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        异步获取K线数据（与 fetch_klines 相同的缓存和返回格式）
+        
+        Args:
+            symbol: 交易对符号
+            interval: K线间隔
+            limit: 获取的K线数量
+            client: 复用的 httpx.AsyncClient，为None时临时创建
+        """
+        key = (symbol, interval, limit)
+        now = time.time()
+        cached = self._cached_klines(key, now)
+        if cached is not None:
+            return cached
+        
+        if client is None:
+            async with self._new_async_client() as client:
+                return await self.fetch_klines_async(symbol, interval, limit, client)
+        
+        try:
+            params = {"symbol": symbol, "interval": interval, "limit": limit}
+            shared_key = self._shared_key("klines", params)
+            content = self._shared_get(shared_key)
             
-            df['trades'] = df['trades'].astype(int)
+            if content is None:
+                logger.info("正在获取 %s 的 %s K线数据，数量: %s", symbol, interval, limit)
+                
+                await self.rate_limiter.acquire_async(klines_weight(limit))
+                response = await client.get("/api/v3/klines", params=params)
+                self._sync_used_weight(response)
+                
+                if response.status_code != 200:
+                    logger.error("API请求失败: %s - %s", response.status_code, response.text)
+                    return None
+                
+                content = response.content
+                self._shared_set(shared_key, self._klines_expiry(interval, now) - now, content)
             
-            # 删除不需要的列
-            df.drop('ignore', axis=1, inplace=True)
+            klines = json_loads(content)
+            if not klines:
+                logger.warning("未获取到 %s 的数据", symbol)
+                return None
             
-            logger.info(f"成功获取 {len(df)} 条 {symbol} K线数据")
+            columns = self._parse_to_columns(klines)
+            logger.info("成功获取 %s 条 %s K线数据", len(klines), symbol)
             
-            return df
+            df = pd.DataFrame(columns)
+            self._store_klines(key, interval, now, columns, df)
+            return df.copy()
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"网络请求错误: {e}")
+        except httpx.HTTPError as e:
+            logger.error("网络请求错误: %s", e)
             return None
         except Exception as e:
-            logger.error(f"数据获取错误: {e}")
+            logger.error("数据获取错误: %s", e)
+            return None
+    
+    def _coalesce(self, key: tuple, request):
+        """
+        合并并发的相同请求：第一个调用方执行request，其余调用方等待并共享同一结果
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            result = request()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+    
+    def _shared_key(self, endpoint: str, params: dict) -> str:
+        """共享缓存键：接口名 + 请求参数摘要"""
+        digest = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+        return f"predict:binance:{endpoint}:{digest}"
+    
+    def _shared_get(self, key: str) -> Optional[bytes]:
+        """读取Redis共享缓存，未启用或Redis不可用时视为未命中"""
+        if self.redis is None:
+            return None
+        try:
+            return self.redis.get(key)
+        except redis.RedisError as e:
+            logger.warning("Redis读取失败: %s", e)
             return None
     
+    def _shared_set(self, key: str, ttl: float, content: bytes):
+        """写入Redis共享缓存（原始响应字节）"""
+        if self.redis is None:
+            return
+        try:
+            self.redis.setex(key, max(1, int(ttl)), content)
+        except redis.RedisError as e:
+            logger.warning("Redis写入失败: %s", e)
+    
+    def _sync_used_weight(self, response):
+        """读取响应头 X-MBX-USED-WEIGHT-1M，校正本地限流计数"""
+        used = response.headers.get("X-MBX-USED-WEIGHT-1M")
+        if used and used.isdigit():
+            self.rate_limiter.sync(int(used))
+    
+    def _new_async_client(self) -> "httpx.AsyncClient":
+        """创建异步HTTP客户端（支持时启用HTTP/2，多个请求复用同一连接）"""
+        return httpx.AsyncClient(base_url=self.base_url, http2=HTTP2_AVAILABLE, timeout=10)
+    
+    def _cached_klines(self, key: tuple, now: float) -> Optional[pd.DataFrame]:
+        """读取K线缓存，未命中或已过期返回None（缓存中只有列数组时按需构造DataFrame）"""
+        with self._cache_lock:
+            cached = self._klines_cache.get(key)
+            if not cached or cached[0] <= now:
+                return None
+            if cached[2] is None:
+                cached[2] = pd.DataFrame(cached[1])
+            df = cached[2]
+        # 深拷贝：调用方原地修改数据也不会影响缓存（pandas 2 未启用写时复制）
+        return df.copy()
+    
+    def _cached_columns(self, key: tuple, now: float) -> Optional[Dict[str, np.ndarray]]:
+        """读取K线缓存的列数组，未命中或已过期返回None"""
+        with self._cache_lock:
+            cached = self._klines_cache.get(key)
+        if cached and cached[0] > now:
+            return dict(cached[1])
+        return None
+    
+    def _store_klines(
+        self,
+        key: tuple,
+        interval: str,
+        now: float,
+        columns: Dict[str, np.ndarray],
+        df: Optional[pd.DataFrame] = None
+    ):
+        """写入K线缓存：[过期时间, 列数组, DataFrame或None]"""
+        # 列数组在调用方之间共享，设为只读防止被原地修改
+        for values in columns.values():
+            values.flags.writeable = False
+        with self._cache_lock:
+            self._klines_cache[key] = [self._klines_expiry(interval, now), columns, df]
+    
+    @staticmethod
+    def _parse_to_columns(klines: list) -> Dict[str, np.ndarray]:
+        """将API返回的K线列表解析为列数组：按列一次性转换成目标类型（不选取最后的ignore列）"""
+        # 按列转置后转换，每列在内存中连续。耗时主要在价格字符串转浮点（numpy的C解析），
+        # 已是单次类型化转换；numba无法处理字符串，JIT或逐行填充预分配数组不会更快
+        arr = np.asarray(klines, dtype=object).T
+        # 时间戳为UTC毫秒整数，按 datetime64[ms] 解释后转为 datetime64[ns]，与 pd.to_datetime(unit='ms') 的结果类型一致
+        times = np.ascontiguousarray(arr[[0, 6]], dtype=np.int64).view('datetime64[ms]').astype('datetime64[ns]')
+        prices = np.ascontiguousarray(arr[1:6], dtype=np.float64)         # open, high, low, close, volume
+        quotes = np.ascontiguousarray(arr[[7, 9, 10]], dtype=np.float64)  # quote_volume, taker_buy_base, taker_buy_quote
+        
+        return {
+            'open_time': times[0],
+            'open': prices[0],
+            'high': prices[1],
+            'low': prices[2],
+            'close': prices[3],
+            'volume': prices[4],
+            'close_time': times[1],
+            'quote_volume': quotes[0],
+            'trades': arr[8].astype(np.int64),
+            'taker_buy_base': quotes[1],
+            'taker_buy_quote': quotes[2],
+        }
+    
     def fetch_recent_klines(
         self, 
         symbol: str, 
@@ -146,7 +548,7 @@ class BinanceDataFetcher:
         if df is None:
             return None
         
-        logger.info(f"获取最近 {minutes} 分钟的 {len(df)} 条K线数据")
+        logger.info("获取最近 %s 分钟的 %s 条K线数据", minutes, len(df))
         
         return df
     
@@ -169,98 +571,161 @@ class BinanceDataFetcher:
         """
         result = {}
         
-        for symbol in symbols:
-            df = self.fetch_klines(symbol, interval, limit)
-            
+        if not symbols:
+            frames = []
+        elif HTTPX_AVAILABLE and not _in_event_loop():
+            # 单个事件循环并发所有请求
+            frames = asyncio.run(self._gather_klines(symbols, interval, limit))
+        else:
+            # 并发请求，请求频率由 rate_limiter 控制；map 保持交易对顺序
+            with ThreadPoolExecutor(max_workers=min(8, len(symbols))) as executor:
+                frames = list(executor.map(lambda symbol: self.fetch_klines(symbol, interval, limit), symbols))
+        
+        for symbol, df in zip(symbols, frames):
             if df is not None:
                 result[symbol] = df
-            
-            # 避免请求过于频繁
-            time.sleep(0.5)
         
-        logger.info(f"成功获取 {len(result)}/{len(symbols)} 个交易对的数据")
+        logger.info("成功获取 %s/%s 个交易对的数据", len(result), len(symbols))
+        
+        return result
+    
+    async def fetch_multi_symbols_async(
+        self,
+        symbols: List[str],
+        interval: str = "1m",
+        limit: int = 100
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        异步批量获取多个交易对的K线数据（需要httpx）
         
+        Returns:
+            字典，键为交易对符号，值为K线DataFrame
+        """
+        frames = await self._gather_klines(symbols, interval, limit)
+        result = {symbol: df for symbol, df in zip(symbols, frames) if df is not None}
+        logger.info("成功获取 %s/%s 个交易对的数据", len(result), len(symbols))
         return result
     
-    def get_current_price(self, symbol: str) -> Optional[float]:
+    async def _gather_klines(self, symbols: List[str], interval: str, limit: int) -> list:
+        """共用一个AsyncClient并发获取，结果与symbols顺序一致"""
+        async with self._new_async_client() as client:
+            return await asyncio.gather(*(
+                self.fetch_klines_async(symbol, interval, limit, client) for symbol in symbols
+            ))
+    
+    def get_current_price(self, symbol: str, cache_bypass: bool = False) -> Optional[float]:
         """
         获取当前价格（最新成交价）
         
         Args:
             symbol: 交易对符号
+            cache_bypass: 为True时跳过缓存直接请求（结果仍会写入缓存）
             
         Returns:
             当前价格，如果失败返回None
         """
+        now = time.time()
+        if not cache_bypass:
+            with self._cache_lock:
+                cached = self._price_cache.get(symbol)
+            if cached and cached[0] > now:
+                return cached[1]
+        
+        return self._coalesce(
+            ('price', symbol, cache_bypass),
+            lambda: self._request_price(symbol, now, cache_bypass)
+        )
+    
+    def _request_price(self, symbol: str, now: float, cache_bypass: bool = False) -> Optional[float]:
+        """请求最新价格（先查Redis共享缓存）并写入本地缓存，失败返回None"""
         try:
             endpoint = f"{self.base_url}/api/v3/ticker/price"
             params = {"symbol": symbol}
+            shared_key = self._shared_key("price", params)
+            content = None if cache_bypass else self._shared_get(shared_key)
             
-            response = requests.get(endpoint, params=params, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                price = float(data['price'])
-                logger.info(f"{symbol} 当前价格: ${price:,.2f}")
-                return price
-            else:
-                logger.error(f"获取价格失败: {response.status_code}")
-                return None
+            if content is None:
+                self.rate_limiter.acquire(PRICE_WEIGHT)
+                response = self.session.get(endpoint, params=params, timeout=5)
+                self._sync_used_weight(response)
+                
+                if response.status_code != 200:
+                    logger.error("获取价格失败: %s", response.status_code)
+                    return None
+                
+                content = response.content
+                self._shared_set(shared_key, SHARED_PRICE_TTL, content)
+            
+            data = json_loads(content)
+            price = float(data['price'])
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("%s 当前价格: $%s", symbol, format(price, ',.2f'))
+            with self._cache_lock:
+                self._price_cache[symbol] = (now + PRICE_CACHE_TTL, price)
+            return price
                 
         except Exception as e:
-            logger.error(f"获取价格错误: {e}")
+            logger.error("获取价格错误: %s", e)
             return None
     
     def save_to_csv(
         self, 
         data: Dict[str, pd.DataFrame], 
-        filepath: str
+        filepath: str,
+        use_arrow: bool = True
     ) -> bool:
         """
-        将K线数据保存到CSV文件
+        将K线数据保存到CSV文件（扩展名为 .parquet 时保存为Parquet）
         
         Args:
             data: 字典，键为交易对，值为DataFrame
             filepath: CSV文件路径
+            use_arrow: 安装了pyarrow时用其C++写入器写CSV，False时使用pandas.to_csv
             
         Returns:
             是否保存成功
         """
         try:
-            # 合并所有交易对的数据
-            all_data = []
-            
-            for symbol, df in data.items():
-                df_copy = df.copy()
-                df_copy['symbol'] = symbol
-                all_data.append(df_copy)
-            
-            if not all_data:
+            if not data:
                 logger.warning("没有数据可保存")
                 return False
             
-            # 合并DataFrame
-            combined_df = pd.concat(all_data, ignore_index=True)
+            # 合并所有交易对的数据：交易对作为concat的键，无需逐个复制DataFrame
+            combined_df = (
+                pd.concat(data, names=['symbol'])
+                .reset_index(level=0)
+                .reset_index(drop=True)
+            )
             
-            # 重新排列列顺序
+            # 重新排列列顺序（fetch_klines 的列已按此顺序构造，symbol 由 reset_index 放在首列，
+            # 通常无需重排复制）
             columns_order = ['symbol', 'open_time', 'open', 'high', 'low', 
                            'close', 'volume', 'close_time', 'quote_volume', 
                            'trades', 'taker_buy_base', 'taker_buy_quote']
-            combined_df = combined_df[columns_order]
-            
-            # 保存到CSV
-            combined_df.to_csv(filepath, index=False)
+            if list(combined_df.columns) != columns_order:
+                combined_df = combined_df.loc[:, columns_order]
+            
+            # 保存到文件
+            if filepath.endswith('.parquet'):
+                combined_df.to_parquet(filepath, engine='pyarrow', compression='snappy', index=False)
+            elif use_arrow and PYARROW_AVAILABLE:
+                pa_csv.write_csv(pa.Table.from_pandas(combined_df, preserve_index=False), filepath)
+            else:
+                combined_df.to_csv(filepath, index=False)
             
-            logger.info(f"数据已保存到: {filepath}")
-            logger.info(f"总共保存 {len(combined_df)} 条记录")
+            logger.info("数据已保存到: %s", filepath)
+            logger.info("总共保存 %s 条记录", len(combined_df))
             
             return True
             
         except Exception as e:
-            logger.error(f"保存CSV错误: {e}")
+            logger.error("保存CSV错误: %s", e)
             return False
 
 
+_format_kline_row = '{} | ${:>8,.2f} | ${:>8,.2f} | ${:>8,.2f} | ${:>8,.2f} | {:>10,.2f}'.format
+
+
 def format_klines_for_prompt(df: pd.DataFrame, limit: int = 15) -> str:
     """
     将K线数据格式化为适合AI模型的文本格式（英文）
@@ -275,25 +740,17 @@ def format_klines_for_prompt(df: pd.DataFrame, limit: int = 15) -> str:
     if df is None or len(df) == 0:
         return "No data"
     
-    # 只取最近的N条
-    df_recent = df.tail(limit).copy()
+    # 只取最近的N条（行数不超过limit时直接使用原DataFrame，只读不复制）
+    df_recent = df if len(df) <= limit else df.tail(limit)
     
-    # 格式化输出（英文表头）
-    lines = []
-    lines.append("Time                | Open      | High      | Low       | Close     | Volume")
-    lines.append("-" * 90)
-    
-    for _, row in df_recent.iterrows():
-        lines.append(
-            f"{row['open_time'].strftime('%Y-%m-%d %H:%M')} | "
-            f"${row['open']:>8,.2f} | "
-            f"${row['high']:>8,.2f} | "
-            f"${row['low']:>8,.2f} | "
-            f"${row['close']:>8,.2f} | "
-            f"{row['volume']:>10,.2f}"
-        )
+    # 时间列整列格式化；数值列整块转为Python float后逐行套用同一格式串，
+    # 不再为每列生成中间Series
+    times = df_recent['open_time'].dt.strftime('%Y-%m-%d %H:%M').tolist()
+    columns = [df_recent[col].to_numpy().tolist() for col in ('open', 'high', 'low', 'close', 'volume')]
     
-    return "\n".join(lines)
+    # 格式化输出（英文表头）
+    header = "Time                | Open      | High      | Low       | Close     | Volume"
+    return "\n".join([header, "-" * 90, *map(_format_kline_row, times, *columns)])
 
 
 # ==================== 测试代码 ====================
@@ -4,18 +4,123 @@
 """
 
 import logging
+from bisect import bisect_right
 from datetime import datetime
 import numpy as np
 
+# numba 可选：未安装时退化为普通Python函数
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# ml_dtypes 可选：提供numpy可用的bfloat16类型
+try:
+    from ml_dtypes import bfloat16
+    BFLOAT16_AVAILABLE = True
+except ImportError:
+    BFLOAT16_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# AI预测DataFrame中各模型的方向/置信度列
+PREDICTION_MODELS = ('grok', 'gemini', 'deepseek')
+PREDICTION_DIRECTION_COLUMNS = [f'{model}_direction' for model in PREDICTION_MODELS]
+PREDICTION_CONFIDENCE_COLUMNS = [f'{model}_confidence' for model in PREDICTION_MODELS]
+
+# 各组特征名（integrate_all 按此顺序拼接）
+GAS_FEATURE_NAMES = ('eth_gas_gwei', 'btc_fee_sat', 'eth_tradeable', 'btc_tradeable')
+KLINE_FEATURE_NAMES = ('current_price', 'price_change_pct', 'avg_volume', 'volatility',
+                       'trend', 'high_price', 'low_price', 'price_range_pct')
+NEWS_FEATURE_NAMES = ('news_score', 'news_pos_ratio', 'news_neg_ratio', 'news_count', 'news_sentiment')
+MARKET_FEATURE_NAMES = ('market_sentiment_score', 'market_confidence', 'fear_greed_index', 'market_sentiment_label')
+AI_FEATURE_NAMES = ('ai_avg_confidence', 'ai_up_count', 'ai_down_count', 'ai_agreement_ratio', 'ai_consensus')
+ORDERBOOK_FEATURE_NAMES = ('orderbook_imbalance', 'support_strength', 'resistance_strength')
+MACRO_FEATURE_NAMES = ('dxy_change', 'sp500_change', 'vix_level', 'risk_appetite')
+FUTURES_FEATURE_NAMES = ('oi_change', 'funding_trend')
+TECHNICAL_FEATURE_NAMES = ('macd_line', 'macd_signal', 'macd_hist', 'rsi', 'bb_position', 'ema_trend')
+TIMEFRAME_FEATURE_NAMES = ('trend_1m', 'trend_15m', 'trend_1h', 'trend_4h')
+SUPPORT_RESISTANCE_FEATURE_NAMES = ('support_distance', 'resistance_distance')
+
+# 直接从同名dict键取值的特征组的默认值（数据缺失或整组为空时使用）
+ORDERBOOK_FEATURE_DEFAULTS = (0, 50, 50)
+MACRO_FEATURE_DEFAULTS = (0, 0, 20, 50)
+FUTURES_FEATURE_DEFAULTS = (0, 0)
+TECHNICAL_FEATURE_DEFAULTS = (0, 0, 0, 50, 0.5, 0)
+SUPPORT_RESISTANCE_FEATURE_DEFAULTS = (2.0, 2.0)
+
+FEATURE_NAMES = (
+    GAS_FEATURE_NAMES + KLINE_FEATURE_NAMES + NEWS_FEATURE_NAMES + MARKET_FEATURE_NAMES
+    + AI_FEATURE_NAMES + ORDERBOOK_FEATURE_NAMES + MACRO_FEATURE_NAMES + FUTURES_FEATURE_NAMES
+    + TECHNICAL_FEATURE_NAMES + TIMEFRAME_FEATURE_NAMES + SUPPORT_RESISTANCE_FEATURE_NAMES
+)
+N_FEATURES = len(FEATURE_NAMES)
+# 特征名 -> 下标
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# format_for_ai_prompt 使用的翻译/表情查找表
+SIGNAL_EMOJIS = {'bullish': "🟢", 'bearish': "🔴"}
+SIGNAL_LABELS = {'bullish': '看多', 'bearish': '看空', 'neutral': '中性'}
+RSI_SIGNAL_LABELS = {'oversold': '超卖', 'overbought': '超买', 'neutral': '中性'}
+BB_SIGNAL_LABELS = {'lower': '接近下轨', 'upper': '接近上轨', 'middle': '中轨区域'}
+EMA_TREND_LABELS = {1: "金叉/多头", -1: "死叉/空头"}
+TREND_LABELS = {1: "上涨", -1: "下跌"}
+SENTIMENT_LABELS = {1: "看涨", -1: "看跌"}
+# 趋势表情：下标 0..4 对应 <-1, [-1,0), 0, (0,1], >1
+TREND_EMOJIS = ("💥", "📉", "➡️", "📈", "🚀")
+# 恐惧贪婪指数分档：<25, <45, <55, <75, 其余
+FEAR_GREED_THRESHOLDS = (25, 45, 55, 75)
+FEAR_GREED_LABELS = ("极度恐惧", "恐惧", "中性", "贪婪", "极度贪婪")
+
+
+@njit(cache=True, error_model='numpy')
+def _kline_stats(close, high, low, volume):
+    """
+    K线统计的纯数值计算（可被numba编译）
+    
+    Returns:
+        (涨跌幅%, 平均成交量, 波动率, 最高价, 最低价)；波动率为样本标准差/均值，少于2根时为NaN
+    """
+    n = close.shape[0]
+    price_change_pct = (close[-1] - close[0]) / close[0] * 100
+    mean = close.mean()
+    if n > 1:
+        deviation = close - mean
+        volatility = np.sqrt((deviation * deviation).sum() / (n - 1)) / mean
+    else:
+        volatility = np.nan
+    return price_change_pct, volume.mean(), volatility, high.max(), low.min()
+
+
+def _dict_features(data, names, defaults):
+    """按特征名从dict取值，缺失的键用对应默认值；data为空时整组返回默认值"""
+    if not data:
+        return defaults
+    get = data.get
+    return [get(name, default) for name, default in zip(names, defaults)]
+
+
+def _feature_getter(features, names):
+    """
+    返回按特征名取值的函数 get(name, default)
+    
+    标准schema（names 与 FEATURE_NAMES 一致）直接按 FEATURE_INDEX 下标读取；
+    其他来源的数据退回到按名字建dict
+    """
+    if len(names) == N_FEATURES and tuple(names) == FEATURE_NAMES:
+        return lambda name, default: features[FEATURE_INDEX[name]]
+    return dict(zip(names, features)).get
+
 
 class DataIntegrator:
     """数据整合器 - 将多源数据转换为AI可理解的向量格式"""
     
-    def __init__(self):
-        self.feature_names = []
-        self.feature_vector = []
+    # 无实例状态（特征schema和查找表都在模块级），不需要实例__dict__
+    __slots__ = ()
     
     def integrate_gas_data(self, gas_data):
         """
@@ -27,9 +132,6 @@ class DataIntegrator:
         Returns:
             特征向量 [eth_gas, btc_fee, eth_suitable, btc_suitable]
         """
-        features = []
-        names = []
-        
         # 处理gas_data可能是check_trading_conditions返回的格式
         if gas_data and isinstance(gas_data, dict):
             # 检查是否有details键（来自check_trading_conditions）
@@ -62,10 +164,7 @@ class DataIntegrator:
             eth_suitable = 0
             btc_suitable = 0
         
-        features.extend([eth_gas, btc_fee, eth_suitable, btc_suitable])
-        names.extend(['eth_gas_gwei', 'btc_fee_sat', 'eth_tradeable', 'btc_tradeable'])
-        
-        return features, names
+        return [eth_gas, btc_fee, eth_suitable, btc_suitable], GAS_FEATURE_NAMES
     
     def integrate_kline_data(self, kline_df, hours=12):
         """
@@ -78,43 +177,30 @@ class DataIntegrator:
         Returns:
             特征向量 [current_price, price_change_pct, volume, volatility, trend]
         """
-        features = []
-        names = []
-        
         if kline_df is not None and not kline_df.empty:
-            # 当前价格
-            current_price = float(kline_df.iloc[-1]['close'])
+            # 取最近hours根（不足时取全部）的原始数组，避免pandas逐次索引
+            n = min(hours, len(kline_df))
+            close = kline_df['close'].to_numpy(dtype=np.float64)[-n:]
             
-            # 使用指定小时数的价格变化
-            if len(kline_df) >= hours:
-                recent_data = kline_df.tail(hours)
-                price_change_pct = (recent_data.iloc[-1]['close'] - recent_data.iloc[0]['close']) / recent_data.iloc[0]['close'] * 100
-            else:
-                price_change_pct = (kline_df.iloc[-1]['close'] - kline_df.iloc[0]['close']) / kline_df.iloc[0]['close'] * 100
+            # 当前价格
+            current_price = float(close[-1])
             
-            # 成交量（最近10条平均）
-            avg_volume = float(kline_df['volume'].tail(10).mean())
-            
-            # 波动率（基于指定小时数）
-            if len(kline_df) >= hours:
-                volatility = float(recent_data['close'].std() / recent_data['close'].mean())
-            else:
-                volatility = float(kline_df['close'].std() / kline_df['close'].mean())
+            # 价格变化、波动率、最高最低价基于指定小时数；成交量取最近10条平均
+            with np.errstate(invalid='ignore', divide='ignore'):
+                stats = _kline_stats(
+                    close,
+                    kline_df['high'].to_numpy(dtype=np.float64)[-n:],
+                    kline_df['low'].to_numpy(dtype=np.float64)[-n:],
+                    kline_df['volume'].to_numpy(dtype=np.float64)[-10:],
+                )
+            price_change_pct, avg_volume, volatility, high_price, low_price = map(float, stats)
             
             # 趋势 (1=上涨, 0=平稳, -1=下跌) - 基于指定小时数
-            trend = 1 if price_change_pct > 1 else (-1 if price_change_pct < -1 else 0)
-            
-            # 最高最低价（指定小时数）
-            if len(kline_df) >= hours:
-                high_price = float(recent_data['high'].max())
-                low_price = float(recent_data['low'].min())
-            else:
-                high_price = float(kline_df['high'].max())
-                low_price = float(kline_df['low'].min())
+            trend = (price_change_pct > 1) - (price_change_pct < -1)
             
             price_range_pct = (high_price - low_price) / low_price * 100
             
-            features.extend([
+            features = [
                 current_price,
                 price_change_pct,
                 avg_volume,
@@ -123,32 +209,11 @@ class DataIntegrator:
                 high_price,
                 low_price,
                 price_range_pct
-            ])
-            
-            names.extend([
-                'current_price',
-                'price_change_pct',
-                'avg_volume',
-                'volatility',
-                'trend',
-                'high_price',
-                'low_price',
-                'price_range_pct'
-            ])
+            ]
         else:
-            features.extend([0] * 8)
-            names.extend([
-                'current_price',
-                'price_change_pct',
-                'avg_volume',
-                'volatility',
-                'trend',
-                'high_price',
-                'low_price',
-                'price_range_pct'
-            ])
-        
-        return features, names
+            features = [0] * 8
+        
+        return features, KLINE_FEATURE_NAMES
     
     def integrate_news_sentiment(self, news_sentiment):
         """
@@ -160,9 +225,6 @@ class DataIntegrator:
         Returns:
             特征向量 [sentiment_score, positive_ratio, negative_ratio, total_news]
         """
-        features = []
-        names = []
-        
         if news_sentiment:
             score = news_sentiment.get('score', 0)
             total = news_sentiment.get('total_news', 0)
@@ -176,13 +238,11 @@ class DataIntegrator:
             # 情绪标签 (1=看涨, 0=中性, -1=看跌)
             sentiment_label = 1 if news_sentiment.get('sentiment') == 'bullish' else (-1 if news_sentiment.get('sentiment') == 'bearish' else 0)
             
-            features.extend([score, pos_ratio, neg_ratio, total, sentiment_label])
-            names.extend(['news_score', 'news_pos_ratio', 'news_neg_ratio', 'news_count', 'news_sentiment'])
+            features = [score, pos_ratio, neg_ratio, total, sentiment_label]
         else:
-            features.extend([0, 0, 0, 0, 0])
-            names.extend(['news_score', 'news_pos_ratio', 'news_neg_ratio', 'news_count', 'news_sentiment'])
+            features = [0, 0, 0, 0, 0]
         
-        return features, names
+        return features, NEWS_FEATURE_NAMES
     
     def integrate_market_sentiment(self, market_sentiment):
         """
@@ -194,9 +254,6 @@ class DataIntegrator:
         Returns:
             特征向量 [sentiment_score, confidence, fear_greed_index, sentiment_label]
         """
-        features = []
-        names = []
-        
         if market_sentiment:
             weighted_score = market_sentiment.get('weighted_score', 0)
             confidence = market_sentiment.get('confidence', 0)
@@ -212,49 +269,28 @@ class DataIntegrator:
             # 情绪标签 (1=看涨, 0=中性, -1=看跌)
             sentiment_label = 1 if market_sentiment.get('overall_sentiment') == 'bullish' else (-1 if market_sentiment.get('overall_sentiment') == 'bearish' else 0)
             
-            features.extend([weighted_score, confidence, fear_greed, sentiment_label])
-            names.extend(['market_sentiment_score', 'market_confidence', 'fear_greed_index', 'market_sentiment_label'])
+            features = [weighted_score, confidence, fear_greed, sentiment_label]
         else:
-            features.extend([0, 0, 50, 0])
-            names.extend(['market_sentiment_score', 'market_confidence', 'fear_greed_index', 'market_sentiment_label'])
+            features = [0, 0, 50, 0]
         
-        return features, names
+        return features, MARKET_FEATURE_NAMES
     
-    def integrate_ai_predictions(self, predictions_df):
+    def integrate_ai_predictions(self, predictions_df, ai_counts=None):
         """
         整合AI预测数据
         
         Args:
             predictions_df: AI预测DataFrame
+            ai_counts: 预先统计好的 _count_ai_directions 结果（可选，避免重复统计）
         
         Returns:
             特征向量 [avg_confidence, up_count, down_count, consensus_direction]
         """
-        features = []
-        names = []
-        
-        if predictions_df is not None and not predictions_df.empty:
-            # 统计各模型预测方向
-            up_count = 0
-            down_count = 0
-            total_confidence = 0
-            count = 0
-            
-            for _, pred in predictions_df.iterrows():
-                for model in ['grok', 'gemini', 'deepseek']:
-                    direction = pred.get(f'{model}_direction')
-                    confidence = pred.get(f'{model}_confidence', 0)
-                    
-                    if direction == 'up':
-                        up_count += 1
-                    elif direction == 'down':
-                        down_count += 1
-                    
-                    if confidence > 0:
-                        total_confidence += confidence
-                        count += 1
-            
-            avg_confidence = total_confidence / count if count > 0 else 0
+        if ai_counts is None:
+            ai_counts = self._count_ai_directions(predictions_df)
+        
+        if ai_counts is not None:
+            up_count, down_count, avg_confidence = ai_counts
             total = up_count + down_count
             
             # 一致性比例
@@ -263,20 +299,46 @@ class DataIntegrator:
             # 共识方向 (1=看涨, 0=不明确, -1=看跌)
             consensus = 1 if up_count > down_count * 1.5 else (-1 if down_count > up_count * 1.5 else 0)
             
-            features.extend([avg_confidence, up_count, down_count, agreement_ratio, consensus])
-            names.extend(['ai_avg_confidence', 'ai_up_count', 'ai_down_count', 'ai_agreement_ratio', 'ai_consensus'])
+            features = [avg_confidence, up_count, down_count, agreement_ratio, consensus]
         else:
-            features.extend([0, 0, 0, 0, 0])
-            names.extend(['ai_avg_confidence', 'ai_up_count', 'ai_down_count', 'ai_agreement_ratio', 'ai_consensus'])
+            features = [0, 0, 0, 0, 0]
         
-        return features, names
+        return features, AI_FEATURE_NAMES
+    
+    def _count_ai_directions(self, predictions_df):
+        """
+        统计AI预测方向和平均置信度（整列比较，缺失的列视为无预测）
+        
+        Returns:
+            (up_count, down_count, avg_confidence)；无预测数据时返回None
+        """
+        if predictions_df is None or predictions_df.empty:
+            return None
+        
+        directions, confidences = self._prediction_arrays(predictions_df)
+        up_count = int((directions == 'up').sum())
+        down_count = int((directions == 'down').sum())
+        
+        positive = confidences > 0
+        avg_confidence = float(confidences[positive].mean()) if positive.any() else 0
+        return up_count, down_count, avg_confidence
+    
+    @staticmethod
+    def _prediction_arrays(predictions_df):
+        """取出三个模型的方向和置信度为 (N, 3) 数组，缺失的列填充为空方向/0置信度"""
+        directions = predictions_df.reindex(columns=PREDICTION_DIRECTION_COLUMNS).to_numpy(dtype=object)
+        confidences = (
+            predictions_df.reindex(columns=PREDICTION_CONFIDENCE_COLUMNS)
+            .to_numpy(dtype=np.float64, na_value=0.0)
+        )
+        return directions, confidences
     
     def integrate_all(self, gas_data=None, kline_df=None, news_sentiment=None, 
                      market_sentiment=None, ai_predictions=None, hours=12,
                      orderbook_data=None, macro_data=None, futures_data=None,
                      technical_indicators=None, multi_timeframe=None, support_resistance=None):
         """
-        整合所有数据（35维）
+        整合所有数据（N_FEATURES=47维，顺序见 FEATURE_NAMES）
         
         Args:
             hours: 分析的小时数
@@ -284,127 +346,61 @@ class DataIntegrator:
             macro_data: 宏观指标（新增）
             futures_data: 期货数据（新增）
         """
-        all_features = []
-        all_names = []
-        
-        # 1. Gas数据
-        gas_features, gas_names = self.integrate_gas_data(gas_data)
-        all_features.extend(gas_features)
-        all_names.extend(gas_names)
-        
-        # 2. K线数据
-        kline_features, kline_names = self.integrate_kline_data(kline_df, hours=hours)
-        all_features.extend(kline_features)
-        all_names.extend(kline_names)
-        
-        # 3. 新闻情绪
-        news_features, news_names = self.integrate_news_sentiment(news_sentiment)
-        all_features.extend(news_features)
-        all_names.extend(news_names)
-        
-        # 4. 市场情绪
-        market_features, market_names = self.integrate_market_sentiment(market_sentiment)
-        all_features.extend(market_features)
-        all_names.extend(market_names)
-        
-        # 5. AI预测
-        ai_features, ai_names = self.integrate_ai_predictions(ai_predictions)
-        all_features.extend(ai_features)
-        all_names.extend(ai_names)
-        
-        # 6. 订单簿（新增3维）
-        if orderbook_data:
-            all_features.extend([
-                orderbook_data.get('orderbook_imbalance', 0),
-                orderbook_data.get('support_strength', 50),
-                orderbook_data.get('resistance_strength', 50)
-            ])
-            all_names.extend(['orderbook_imbalance', 'support_strength', 'resistance_strength'])
-        else:
-            all_features.extend([0, 50, 50])
-            all_names.extend(['orderbook_imbalance', 'support_strength', 'resistance_strength'])
-        
-        # 7. 宏观指标（新增4维）
-        if macro_data:
-            all_features.extend([
-                macro_data.get('dxy_change', 0),
-                macro_data.get('sp500_change', 0),
-                macro_data.get('vix_level', 20),
-                macro_data.get('risk_appetite', 50)
-            ])
-            all_names.extend(['dxy_change', 'sp500_change', 'vix_level', 'risk_appetite'])
-        else:
-            all_features.extend([0, 0, 20, 50])
-            all_names.extend(['dxy_change', 'sp500_change', 'vix_level', 'risk_appetite'])
-        
-        # 8. 期货数据（新增2维）
-        if futures_data:
-            all_features.extend([
-                futures_data.get('oi_change', 0),
-                futures_data.get('funding_trend', 0)
-            ])
-            all_names.extend(['oi_change', 'funding_trend'])
-        else:
-            all_features.extend([0, 0])
-            all_names.extend(['oi_change', 'funding_trend'])
-        
-        # 9. 技术指标（Phase 2新增6维）
-        if technical_indicators:
-            all_features.extend([
-                technical_indicators.get('macd_line', 0),
-                technical_indicators.get('macd_signal', 0),
-                technical_indicators.get('macd_hist', 0),
-                technical_indicators.get('rsi', 50),
-                technical_indicators.get('bb_position', 0.5),
-                technical_indicators.get('ema_trend', 0)
-            ])
-            all_names.extend(['macd_line', 'macd_signal', 'macd_hist', 'rsi', 'bb_position', 'ema_trend'])
-        else:
-            all_features.extend([0, 0, 0, 50, 0.5, 0])
-            all_names.extend(['macd_line', 'macd_signal', 'macd_hist', 'rsi', 'bb_position', 'ema_trend'])
+        # 1-5. 基础数据：Gas、K线、新闻情绪、市场情绪、AI预测
+        gas_features, _ = self.integrate_gas_data(gas_data)
+        kline_features, _ = self.integrate_kline_data(kline_df, hours=hours)
+        news_features, _ = self.integrate_news_sentiment(news_sentiment)
+        market_features, _ = self.integrate_market_sentiment(market_sentiment)
+        ai_counts = self._count_ai_directions(ai_predictions)
+        ai_features, _ = self.integrate_ai_predictions(ai_predictions, ai_counts=ai_counts)
+        
+        # 6-9. 订单簿（新增3维）、宏观指标（新增4维）、期货数据（新增2维）、技术指标（Phase 2新增6维）
+        orderbook_features = _dict_features(orderbook_data, ORDERBOOK_FEATURE_NAMES, ORDERBOOK_FEATURE_DEFAULTS)
+        macro_features = _dict_features(macro_data, MACRO_FEATURE_NAMES, MACRO_FEATURE_DEFAULTS)
+        futures_features = _dict_features(futures_data, FUTURES_FEATURE_NAMES, FUTURES_FEATURE_DEFAULTS)
+        technical_features = _dict_features(technical_indicators, TECHNICAL_FEATURE_NAMES, TECHNICAL_FEATURE_DEFAULTS)
         
         # 10. 多周期趋势（Phase 2新增4维）
         if multi_timeframe and 'timeframes' in multi_timeframe:
             tf = multi_timeframe['timeframes']
-            all_features.extend([
+            timeframe_features = [
                 tf.get('1m', {}).get('trend', 0),
                 tf.get('15m', {}).get('trend', 0),
                 tf.get('1h', {}).get('trend', 0),
                 tf.get('4h', {}).get('trend', 0)
-            ])
-            all_names.extend(['trend_1m', 'trend_15m', 'trend_1h', 'trend_4h'])
+            ]
         else:
-            all_features.extend([0, 0, 0, 0])
-            all_names.extend(['trend_1m', 'trend_15m', 'trend_1h', 'trend_4h'])
+            timeframe_features = [0, 0, 0, 0]
         
         # 11. 支撑阻力（Phase 2新增2维）
-        if support_resistance:
-            all_features.extend([
-                support_resistance.get('support_distance', 2.0),
-                support_resistance.get('resistance_distance', 2.0)
-            ])
-            all_names.extend(['support_distance', 'resistance_distance'])
-        else:
-            all_features.extend([2.0, 2.0])
-            all_names.extend(['support_distance', 'resistance_distance'])
+        support_resistance_features = _dict_features(
+            support_resistance, SUPPORT_RESISTANCE_FEATURE_NAMES, SUPPORT_RESISTANCE_FEATURE_DEFAULTS
+        )
+        
+        # 按 FEATURE_NAMES 的顺序一次拼接
+        all_features = [
+            *gas_features, *kline_features, *news_features, *market_features, *ai_features,
+            *orderbook_features, *macro_features, *futures_features,
+            *technical_features, *timeframe_features, *support_resistance_features
+        ]
         
         # 生成摘要
         summary = self._generate_summary(
             gas_data, kline_df, news_sentiment, 
-            market_sentiment, ai_predictions
+            market_sentiment, ai_predictions, ai_counts=ai_counts
         )
         
         return {
             'features': all_features,
-            'feature_names': all_names,
-            'feature_count': len(all_features),
+            'feature_names': list(FEATURE_NAMES),
+            'feature_count': N_FEATURES,
             'summary': summary,
             'timestamp': datetime.now().isoformat()
         }
     
     def _generate_summary(self, gas_data, kline_df, news_sentiment, 
-                         market_sentiment, ai_predictions):
-        """生成关键指标摘要"""
+                         market_sentiment, ai_predictions, ai_counts=None):
+        """生成关键指标摘要（ai_counts 为预先统计好的AI预测方向，可选）"""
         summary = {}
         
         # Gas费用
@@ -422,22 +418,17 @@ class DataIntegrator:
             summary['sentiment_score'] = market_sentiment.get('weighted_score')
         
         # AI共识
-        if ai_predictions is not None and not ai_predictions.empty:
-            up_count = 0
-            down_count = 0
-            for _, pred in ai_predictions.iterrows():
-                for model in ['grok', 'gemini', 'deepseek']:
-                    if pred.get(f'{model}_direction') == 'up':
-                        up_count += 1
-                    elif pred.get(f'{model}_direction') == 'down':
-                        down_count += 1
-            
+        if ai_counts is None:
+            ai_counts = self._count_ai_directions(ai_predictions)
+        if ai_counts is not None:
+            up_count, down_count, _ = ai_counts
             summary['ai_consensus'] = 'bullish' if up_count > down_count else ('bearish' if down_count > up_count else 'neutral')
         
         return summary
     
     def format_for_ai_prompt(self, integrated_data, technical_indicators=None, 
-                              multi_timeframe=None, support_resistance=None):
+                              multi_timeframe=None, support_resistance=None,
+                              include_raw_vector=False):
         """
         格式化为AI Prompt友好的格式（包含Phase2技术指标）
         
@@ -446,6 +437,7 @@ class DataIntegrator:
             technical_indicators: 技术指标详细信息
             multi_timeframe: 多周期分析详细信息
             support_resistance: 支撑阻力详细信息
+            include_raw_vector: 是否附带逐项的完整特征向量（调试用，默认不输出）
         
         Returns:
             str: AI可读的数据描述
@@ -454,43 +446,46 @@ class DataIntegrator:
         names = integrated_data['feature_names']
         summary = integrated_data.get('summary', {})
         
-        # 构建增强的数据描述
-        prompt = "=" * 80 + "\n"
-        prompt += "市场数据分析报告 (Phase 2增强版)\n"
-        prompt += "=" * 80 + "\n\n"
+        # 构建增强的数据描述（逐段append，最后一次join）
+        parts = []
+        append = parts.append  # 绑定方法，省去每次的属性查找
+        
+        append("=" * 80 + "\n")
+        append("市场数据分析报告 (Phase 2增强版)\n")
+        append("=" * 80 + "\n\n")
         
         # 特征维度信息
-        prompt += f"📊 特征维度: {len(features)}维\n"
-        prompt += f"   - 基础数据: 26维\n"
-        prompt += f"   - Phase1扩展: 9维 (订单簿+宏观+期货)\n"
-        prompt += f"   - Phase2技术分析: 12维 (MACD+RSI+BB+多周期+支撑阻力)\n\n"
+        append(f"📊 特征维度: {len(features)}维\n")
+        append(f"   - 基础数据: 26维\n")
+        append(f"   - Phase1扩展: 9维 (订单簿+宏观+期货)\n")
+        append(f"   - Phase2技术分析: 12维 (MACD+RSI+BB+多周期+支撑阻力)\n\n")
         
         # === 价格信息 ===
-        prompt += "【💰 价格信息】\n"
-        feature_dict = dict(zip(names, features))
-        current_price = feature_dict.get('current_price', 0)
-        price_change = feature_dict.get('price_change_pct', 0)
-        volatility = feature_dict.get('volatility', 0)
+        append("【💰 价格信息】\n")
+        feature = _feature_getter(features, names)
+        current_price = feature('current_price', 0)
+        price_change = feature('price_change_pct', 0)
+        volatility = feature('volatility', 0)
         
-        prompt += f"当前价格: ${current_price:,.2f}\n"
-        prompt += f"价格变化: {price_change:+.2f}% ({self._get_trend_emoji(price_change)})\n"
-        prompt += f"波动率: {volatility:.4f}\n"
+        append(f"当前价格: ${current_price:,.2f}\n")
+        append(f"价格变化: {price_change:+.2f}% ({self._get_trend_emoji(price_change)})\n")
+        append(f"波动率: {volatility:.4f}\n")
         
         # 支撑阻力位
         if support_resistance:
-            prompt += f"最近支撑: ${support_resistance.get('nearest_support', 0):,.2f} "
-            prompt += f"(距离 {support_resistance.get('support_distance', 0):.2f}%)\n"
-            prompt += f"最近阻力: ${support_resistance.get('nearest_resistance', 0):,.2f} "
-            prompt += f"(距离 {support_resistance.get('resistance_distance', 0):.2f}%)\n"
+            append(f"最近支撑: ${support_resistance.get('nearest_support', 0):,.2f} ")
+            append(f"(距离 {support_resistance.get('support_distance', 0):.2f}%)\n")
+            append(f"最近阻力: ${support_resistance.get('nearest_resistance', 0):,.2f} ")
+            append(f"(距离 {support_resistance.get('resistance_distance', 0):.2f}%)\n")
         else:
-            support_dist = feature_dict.get('support_distance', 2.0)
-            resistance_dist = feature_dict.get('resistance_distance', 2.0)
-            prompt += f"支撑距离: {support_dist:.2f}%, 阻力距离: {resistance_dist:.2f}%\n"
+            support_dist = feature('support_distance', 2.0)
+            resistance_dist = feature('resistance_distance', 2.0)
+            append(f"支撑距离: {support_dist:.2f}%, 阻力距离: {resistance_dist:.2f}%\n")
         
-        prompt += "\n"
+        append("\n")
         
         # === 技术指标 ===
-        prompt += "【📈 技术指标】\n"
+        append("【📈 技术指标】\n")
         if technical_indicators:
             # MACD
             macd_line = technical_indicators.get('macd_line', 0)
@@ -498,35 +493,35 @@ class DataIntegrator:
             macd_hist = technical_indicators.get('macd_hist', 0)
             macd_signal_text = technical_indicators.get('macd_signal_text', 'neutral')
             
-            prompt += f"MACD: {macd_line:.2f} (信号线: {macd_signal:.2f}, 柱: {macd_hist:.2f})\n"
-            prompt += f"      状态: {self._translate_signal(macd_signal_text)} "
-            prompt += f"{self._get_signal_emoji(macd_signal_text)}\n"
+            append(f"MACD: {macd_line:.2f} (信号线: {macd_signal:.2f}, 柱: {macd_hist:.2f})\n")
+            append(f"      状态: {self._translate_signal(macd_signal_text)} ")
+            append(f"{self._get_signal_emoji(macd_signal_text)}\n")
             
             # RSI
             rsi = technical_indicators.get('rsi', 50)
             rsi_signal = technical_indicators.get('rsi_signal', 'neutral')
-            prompt += f"RSI(14): {rsi:.1f} - {self._translate_rsi(rsi_signal)} "
-            prompt += f"{self._get_rsi_emoji(rsi)}\n"
+            append(f"RSI(14): {rsi:.1f} - {self._translate_rsi(rsi_signal)} ")
+            append(f"{self._get_rsi_emoji(rsi)}\n")
             
             # 布林带
             bb_position = technical_indicators.get('bb_position', 0.5)
             bb_signal = technical_indicators.get('bb_signal', 'middle')
-            prompt += f"布林带位置: {bb_position:.2f} ({self._translate_bb(bb_signal)}) "
-            prompt += f"{self._get_bb_emoji(bb_position)}\n"
+            append(f"布林带位置: {bb_position:.2f} ({self._translate_bb(bb_signal)}) ")
+            append(f"{self._get_bb_emoji(bb_position)}\n")
             
             # EMA
             ema_trend = technical_indicators.get('ema_trend', 0)
-            prompt += f"EMA趋势: {self._translate_ema(ema_trend)} "
-            prompt += f"{self._get_trend_emoji(ema_trend)}\n"
+            append(f"EMA趋势: {self._translate_ema(ema_trend)} ")
+            append(f"{self._get_trend_emoji(ema_trend)}\n")
         else:
-            prompt += f"MACD: {feature_dict.get('macd_line', 0):.2f}, "
-            prompt += f"RSI: {feature_dict.get('rsi', 50):.1f}, "
-            prompt += f"BB位置: {feature_dict.get('bb_position', 0.5):.2f}\n"
+            append(f"MACD: {feature('macd_line', 0):.2f}, ")
+            append(f"RSI: {feature('rsi', 50):.1f}, ")
+            append(f"BB位置: {feature('bb_position', 0.5):.2f}\n")
         
-        prompt += "\n"
+        append("\n")
         
         # === 多周期趋势 ===
-        prompt += "【⏱️ 多周期趋势分析】\n"
+        append("【⏱️ 多周期趋势分析】\n")
         if multi_timeframe and 'timeframes' in multi_timeframe:
             tf = multi_timeframe['timeframes']
             
@@ -534,83 +529,73 @@ class DataIntegrator:
                                   ('1h', '1小时'), ('4h', '4小时')]:
                 trend = tf.get(period, {}).get('trend', 0)
                 rsi = tf.get(period, {}).get('rsi', 50)
-                prompt += f"{label:6s}: {self._translate_trend(trend)} "
-                prompt += f"{self._get_trend_emoji(trend)} (RSI:{rsi:.0f})\n"
+                append(f"{label:6s}: {self._translate_trend(trend)} ")
+                append(f"{self._get_trend_emoji(trend)} (RSI:{rsi:.0f})\n")
             
             consistency = multi_timeframe.get('trend_consistency', 0)
             overall = multi_timeframe.get('overall_trend', 0)
-            prompt += f"\n趋势一致性: {consistency:.0%} "
-            prompt += f"(主流方向: {self._translate_trend(overall)})\n"
+            append(f"\n趋势一致性: {consistency:.0%} ")
+            append(f"(主流方向: {self._translate_trend(overall)})\n")
         else:
-            prompt += f"1分钟: {self._translate_trend(feature_dict.get('trend_1m', 0))}, "
-            prompt += f"15分钟: {self._translate_trend(feature_dict.get('trend_15m', 0))}, "
-            prompt += f"1小时: {self._translate_trend(feature_dict.get('trend_1h', 0))}, "
-            prompt += f"4小时: {self._translate_trend(feature_dict.get('trend_4h', 0))}\n"
+            append(f"1分钟: {self._translate_trend(feature('trend_1m', 0))}, ")
+            append(f"15分钟: {self._translate_trend(feature('trend_15m', 0))}, ")
+            append(f"1小时: {self._translate_trend(feature('trend_1h', 0))}, ")
+            append(f"4小时: {self._translate_trend(feature('trend_4h', 0))}\n")
         
-        prompt += "\n"
+        append("\n")
         
         # === 市场情绪 ===
-        prompt += "【😊 市场情绪】\n"
-        fear_greed = feature_dict.get('fear_greed_index', 50)
-        prompt += f"恐惧贪婪指数: {fear_greed:.0f}/100 "
-        prompt += f"({self._get_fear_greed_label(fear_greed)})\n"
+        append("【😊 市场情绪】\n")
+        fear_greed = feature('fear_greed_index', 50)
+        append(f"恐惧贪婪指数: {fear_greed:.0f}/100 ")
+        append(f"({self._get_fear_greed_label(fear_greed)})\n")
         
-        news_sentiment = feature_dict.get('news_sentiment', 0)
-        news_count = feature_dict.get('news_count', 0)
-        prompt += f"新闻情绪: {self._translate_sentiment(news_sentiment)} "
-        prompt += f"(共{int(news_count)}条)\n"
+        news_sentiment = feature('news_sentiment', 0)
+        news_count = feature('news_count', 0)
+        append(f"新闻情绪: {self._translate_sentiment(news_sentiment)} ")
+        append(f"(共{int(news_count)}条)\n")
         
-        market_sentiment = feature_dict.get('market_sentiment_label', 0)
-        prompt += f"市场情绪: {self._translate_sentiment(market_sentiment)}\n"
+        market_sentiment = feature('market_sentiment_label', 0)
+        append(f"市场情绪: {self._translate_sentiment(market_sentiment)}\n")
         
-        prompt += "\n"
+        append("\n")
         
         # === Gas费用 ===
-        prompt += "【⛽ Gas费用】\n"
-        eth_gas = feature_dict.get('eth_gas_gwei', 0)
-        btc_fee = feature_dict.get('btc_fee_sat', 0)
-        eth_ok = feature_dict.get('eth_tradeable', 0)
-        btc_ok = feature_dict.get('btc_tradeable', 0)
-        
-        prompt += f"ETH Gas: {eth_gas:.2f} Gwei {'✅' if eth_ok else '❌'}\n"
-        prompt += f"BTC Fee: {btc_fee:.0f} sat/vB {'✅' if btc_ok else '❌'}\n"
-        
-        prompt += "\n"
-        
-        # === 完整特征向量 ===
-        prompt += "【🔢 完整特征向量】\n"
-        for i, (name, value) in enumerate(zip(names, features)):
-            if isinstance(value, float):
-                prompt += f"[{i:2d}] {name:25s}: {value:>10.4f}\n"
-            else:
-                prompt += f"[{i:2d}] {name:25s}: {value:>10}\n"
+        append("【⛽ Gas费用】\n")
+        eth_gas = feature('eth_gas_gwei', 0)
+        btc_fee = feature('btc_fee_sat', 0)
+        eth_ok = feature('eth_tradeable', 0)
+        btc_ok = feature('btc_tradeable', 0)
+        
+        append(f"ETH Gas: {eth_gas:.2f} Gwei {'✅' if eth_ok else '❌'}\n")
+        append(f"BTC Fee: {btc_fee:.0f} sat/vB {'✅' if btc_ok else '❌'}\n")
+        
+        append("\n")
+        
+        # === 完整特征向量（仅调试时输出） ===
+        if include_raw_vector:
+            append("【🔢 完整特征向量】\n")
+            for i, (name, value) in enumerate(zip(names, features)):
+                if isinstance(value, float):
+                    append(f"[{i:2d}] {name:25s}: {value:>10.4f}\n")
+                else:
+                    append(f"[{i:2d}] {name:25s}: {value:>10}\n")
+            
+            append("\n")
         
-        prompt += "\n"
-        prompt += "=" * 80 + "\n"
+        append("=" * 80 + "\n")
         
-        return prompt
+        return "".join(parts)
     
     def _get_trend_emoji(self, value):
-        """获取趋势表情"""
-        if value > 1:
-            return "🚀"
-        elif value > 0:
-            return "📈"
-        elif value < -1:
-            return "💥"
-        elif value < 0:
-            return "📉"
-        else:
-            return "➡️"
+        """获取趋势表情（按符号和是否超过±1取 TREND_EMOJIS）"""
+        # 比较结果转int，兼容numpy标量（np.bool_不支持相减）
+        sign = int(value > 0) - int(value < 0)
+        return TREND_EMOJIS[2 + sign * (1 + int(abs(value) > 1))]
     
     def _get_signal_emoji(self, signal):
         """获取信号表情"""
-        if signal == 'bullish':
-            return "🟢"
-        elif signal == 'bearish':
-            return "🔴"
-        else:
-            return "⚪"
+        return SIGNAL_EMOJIS.get(signal, "⚪")
     
     def _get_rsi_emoji(self, rsi):
         """获取RSI表情"""
@@ -632,74 +617,49 @@ class DataIntegrator:
     
     def _translate_signal(self, signal):
         """翻译信号"""
-        mapping = {
-            'bullish': '看多',
-            'bearish': '看空',
-            'neutral': '中性'
-        }
-        return mapping.get(signal, signal)
+        return SIGNAL_LABELS.get(signal, signal)
     
     def _translate_rsi(self, signal):
         """翻译RSI信号"""
-        mapping = {
-            'oversold': '超卖',
-            'overbought': '超买',
-            'neutral': '中性'
-        }
-        return mapping.get(signal, signal)
+        return RSI_SIGNAL_LABELS.get(signal, signal)
     
     def _translate_bb(self, signal):
         """翻译布林带信号"""
-        mapping = {
-            'lower': '接近下轨',
-            'upper': '接近上轨',
-            'middle': '中轨区域'
-        }
-        return mapping.get(signal, signal)
+        return BB_SIGNAL_LABELS.get(signal, signal)
     
     def _translate_ema(self, trend):
         """翻译EMA趋势"""
-        if trend == 1:
-            return "金叉/多头"
-        elif trend == -1:
-            return "死叉/空头"
-        else:
-            return "震荡"
+        return EMA_TREND_LABELS.get(trend, "震荡")
     
     def _translate_trend(self, trend):
         """翻译趋势"""
-        if trend == 1:
-            return "上涨"
-        elif trend == -1:
-            return "下跌"
-        else:
-            return "震荡"
+        return TREND_LABELS.get(trend, "震荡")
     
     def _translate_sentiment(self, sentiment):
         """翻译情绪"""
-        if sentiment == 1:
-            return "看涨"
-        elif sentiment == -1:
-            return "看跌"
-        else:
-            return "中性"
+        return SENTIMENT_LABELS.get(sentiment, "中性")
     
     def _get_fear_greed_label(self, value):
-        """恐惧贪婪标签"""
-        if value < 25:
-            return "极度恐惧"
-        elif value < 45:
-            return "恐惧"
-        elif value < 55:
-            return "中性"
-        elif value < 75:
-            return "贪婪"
-        else:
-            return "极度贪婪"
+        """恐惧贪婪标签（按 FEAR_GREED_THRESHOLDS 分档）"""
+        return FEAR_GREED_LABELS[bisect_right(FEAR_GREED_THRESHOLDS, value)]
     
     def to_numpy_array(self, integrated_data):
-        """转换为numpy数组"""
-        return np.array(integrated_data['features'], dtype=np.float32)
+        """转换为numpy数组（float32，预分配固定长度）"""
+        features = integrated_data['features']
+        return np.fromiter(features, dtype=np.float32, count=len(features))
+    
+    def to_bfloat16_array(self, integrated_data):
+        """
+        转换为bfloat16数组（供下游模型使用，内存再减半）
+        
+        注意：bfloat16只有约3位有效数字，价格、成交量等未归一化的特征会明显失真，
+        建议归一化后再使用。未安装ml_dtypes时返回float32数组
+        """
+        features = self.to_numpy_array(integrated_data)
+        if not BFLOAT16_AVAILABLE:
+            logger.warning("未安装ml_dtypes，返回float32特征数组")
+            return features
+        return features.astype(bfloat16)
     
     def to_dict(self, integrated_data):
         """转换为字典格式（特征名:值）"""